@@ -6,69 +6,1976 @@ Powered by <Ваш Watermark>
 Описание: Бот для автоматического пинга, чек-ина и управления узлами LayerEdge с поддержкой прокси.
 """
 
+import argparse
 import asyncio
+import bisect
+import contextlib
+import copy
+import gzip
+import hashlib
+import heapq
+import inspect
+import itertools
 import json
+import multiprocessing
 import os
+import queue
+import random
+import re
+import signal
+import sqlite3
+import sys
+import threading
 import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import curses
 
 import pytz
-from aiohttp import ClientResponseError, ClientSession, ClientTimeout
-from aiohttp_socks import ProxyConnector
+from aiohttp import ClientConnectionError, ClientResponseError, ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from aiohttp_socks import ProxyConnectionError, ProxyConnector, ProxyError, ProxyTimeoutError
 from colorama import Fore, Style, init
-from eth_account import Account
-from eth_account.messages import encode_defunct
-from fake_useragent import FakeUserAgent
+from multidict import CIMultiDict
+
+try:
+    from aiohttp import ConnectionTimeoutError
+except ImportError:  # aiohttp < 3.10: таймаут соединения не отличить от таймаута ответа
+    ConnectionTimeoutError = ()
 
 # Инициализация colorama
 init(autoreset=True)
 
-# Временная зона (например, Asia/Jakarta)
-WIB = pytz.timezone('Europe/Moscow')
+# Временная зона (например, Asia/Jakarta)
+WIB = pytz.timezone('Europe/Moscow')
+
+API_BASE = "https://referralapi.layeredge.io/api"
+
+
+LOG_LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class LogPipeline:
+    """
+    Буферизованное логирование: вызовы emit() только кладут запись в очередь,
+    форматирование и запись выполняются в фоновом потоке.
+     - консоль: компактный цветной формат [HH:MM:SS] >> ...;
+     - файл (json_path): JSON lines;
+     - фильтр по уровню; таймстамп форматируется не чаще раза в секунду;
+     - одинаковые предупреждения и ошибки одного аккаунта за dedupe_window секунд
+       выводятся один раз, затем — сводка с числом повторов.
+    """
+
+    def __init__(self, level="info", json_path=None, console=True, dedupe_window=60.0):
+        self.level = LOG_LEVELS[level]
+        self.json_path = json_path
+        self.console = console
+        self.dedupe_window = dedupe_window
+        self._queue = queue.Queue()
+        self._thread = None
+        self._json_file = None
+        self._second = None
+        self._clock = ""
+        # Окна подавления повторов в порядке их начала: истёкшие всегда в голове
+        self._repeats = OrderedDict()
+        self._next_flush = 0.0
+
+    def start(self):
+        if self._thread is None:
+            if self.json_path:
+                self._json_file = open(self.json_path, 'a', encoding='utf-8')
+            self._thread = threading.Thread(target=self._run, name="log-pipeline", daemon=True)
+            self._thread.start()
+
+    def emit(self, level: str, message: str, account=None, proxy=None):
+        """Постановка записи в очередь (без форматирования и ввода-вывода)."""
+        if LOG_LEVELS[level] < self.level:
+            return
+        if self._thread is None:
+            self.start()
+        self._queue.put((time.time(), level, message, account, proxy))
+
+    def close(self, timeout=5.0):
+        """Дописать очередь и остановить поток."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        if self._json_file is not None:
+            self._json_file.close()
+            self._json_file = None
+
+    def _clock_for(self, ts: float) -> str:
+        second = int(ts)
+        if second != self._second:
+            self._second = second
+            self._clock = datetime.fromtimestamp(second, WIB).strftime('%H:%M:%S')
+        return self._clock
+
+    def _run(self):
+        while True:
+            try:
+                record = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self._flush_repeats(time.time())
+                self._flush_streams()
+                continue
+            if record is None:
+                self._flush_repeats(float("inf"))
+                self._flush_streams()
+                return
+            self._handle(*record)
+            if self._queue.empty():
+                # Сводки по повторам проверяются не чаще раза в секунду
+                if record[0] >= self._next_flush:
+                    self._flush_repeats(record[0])
+                self._flush_streams()
+
+    def _handle(self, ts, level, message, account, proxy):
+        if LOG_LEVELS[level] >= LOG_LEVELS["warning"] and self.dedupe_window:
+            # Аккаунт входит в ключ: одинаковый статус разных аккаунтов — разные события
+            key = (level, message, account)
+            entry = self._repeats.get(key)
+            if entry is not None:
+                if ts - entry[0] < self.dedupe_window:
+                    entry[1] += 1
+                    return
+                # Окно истекло раньше очередной проверки: сводка за него и новое окно в конце очереди
+                del self._repeats[key]
+                self._write_repeats(ts, key, entry[1], entry[2])
+            self._repeats[key] = [ts, 0, proxy]
+        self._write(ts, level, message, account, proxy)
+
+    def _flush_repeats(self, now):
+        """Сводка по подавленным повторам, окно которых истекло (просматривается только голова очереди)."""
+        self._next_flush = now + 1.0
+        ts = now if now != float("inf") else time.time()
+        while self._repeats:
+            key, (started, count, proxy) = next(iter(self._repeats.items()))
+            if now - started < self.dedupe_window:
+                break
+            self._repeats.popitem(last=False)
+            self._write_repeats(ts, key, count, proxy)
+
+    def _write_repeats(self, ts, key, count, proxy):
+        if count:
+            level, message, account = key
+            self._write(ts, level, f"{message} (повторено ещё {count} раз)", account, proxy)
+
+    def _write(self, ts, level, message, account, proxy):
+        if self.console:
+            prefix = f"{Fore.LIGHTCYAN_EX}[{self._clock_for(ts)}]{Style.RESET_ALL} >> "
+            if account is None:
+                line = prefix + message
+            else:
+                line = (
+                    f"{prefix}Account: {Fore.WHITE}{account}{Style.RESET_ALL} | "
+                    f"Proxy: {Fore.WHITE}{proxy}{Style.RESET_ALL} | "
+                    f"Status: {message}"
+                )
+            sys.stdout.write(line + "\n")
+        if self._json_file is not None:
+            record = {"ts": round(ts, 3), "level": level, "msg": ANSI_RE.sub("", message)}
+            if account is not None:
+                record["account"] = account
+                record["proxy"] = proxy
+            self._json_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _flush_streams(self):
+        if self.console:
+            sys.stdout.flush()
+        if self._json_file is not None:
+            self._json_file.flush()
+
+
+def json_codec(fast: bool):
+    """
+    Кодек JSON для тел запросов и ответов: (dumps -> bytes, loads, название).
+    В режиме производительности используется orjson, если он установлен, иначе стандартный json.
+    """
+    if fast:
+        try:
+            import orjson
+        except ImportError:
+            pass
+        else:
+            return orjson.dumps, orjson.loads, "orjson"
+    return (lambda obj: json.dumps(obj).encode()), json.loads, "json"
+
+
+def install_uvloop() -> bool:
+    """Цикл событий uvloop для последующих asyncio.run(); False, если пакет не установлен."""
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
+def derive_address(account: str):
+    """Адрес кошелька из приватного ключа (для пула процессов) или None при ошибке."""
+    from eth_account import Account
+
+    try:
+        return Account.from_key(account).address
+    except Exception:
+        return None
+
+
+class AddressCache:
+    """
+    Дисковый кеш адресов кошельков: sha256(приватный ключ) -> адрес.
+    Сами ключи в кеш не записываются.
+    """
+
+    def __init__(self, path="address_cache.json"):
+        self.path = path
+        self._cache = {}
+        self._dirty = False
+
+    @staticmethod
+    def key_hash(account: str) -> str:
+        normalized = account.strip().lower()
+        if normalized.startswith("0x"):
+            normalized = normalized[2:]
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self._cache = json.load(f)
+        except (OSError, ValueError):
+            self._cache = {}
+
+    def get(self, account: str):
+        return self._cache.get(self.key_hash(account))
+
+    def put(self, account: str, address: str):
+        self._cache[self.key_hash(account)] = address
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        # Воркеры шардов сохраняют кеш одновременно, поэтому временный файл у каждого процесса свой
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._cache, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+
+    def clear(self):
+        """Освобождение памяти после генерации адресов (несохранённые записи теряются)."""
+        self._cache = {}
+        self._dirty = False
+
+
+HEX_KEY_RE = re.compile(r"^(?:0x)?[0-9a-fA-F]{64}$")
+PROXY_RE = re.compile(r"^(?:https?|socks4|socks5)://(?:[^@/\s]+@)?[^:@/\s]+:\d{1,5}/?$")
+
+
+def read_accounts(lines, on_invalid=None):
+    """
+    Потоковый разбор списка приватных ключей (файл читается построчно, целиком в память не попадает).
+    Пустые строки и комментарии (#) пропускаются; для строк, не похожих на ключ
+    (64 hex-символа, с 0x или без), вызывается on_invalid(номер строки, строка).
+    Ключи выдаются в виде 0x + hex в нижнем регистре.
+    """
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        if not HEX_KEY_RE.match(line):
+            if on_invalid is not None:
+                on_invalid(line_no, line)
+            continue
+        yield "0x" + line[-64:].lower()
+
+
+def read_proxies(lines, normalize, on_invalid=None):
+    """
+    Потоковый разбор списка прокси: normalize(строка) приводит схему,
+    строки без host:port пропускаются через on_invalid, повторы отбрасываются.
+    """
+    seen = set()
+    for line_no, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        proxy = normalize(line)
+        if not PROXY_RE.match(proxy):
+            if on_invalid is not None:
+                on_invalid(line_no, line)
+            continue
+        if proxy not in seen:
+            seen.add(proxy)
+            yield proxy
+
+
+class FileWatcher:
+    """
+    Отслеживание изменений файлов опросом os.stat (время изменения и размер).
+    Изменение сообщается, только когда файл не менялся весь интервал опроса, —
+    чтобы не читать файл, который ещё дописывается.
+    """
+
+    def __init__(self, paths):
+        self._loaded = {path: self._signature(path) for path in paths}
+        self._seen = dict(self._loaded)
+
+    @staticmethod
+    def _signature(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reset(self, path):
+        """Текущее состояние файла становится загруженным (после записи файла самим ботом)."""
+        self._loaded[path] = self._seen[path] = self._signature(path)
+
+    def changed(self) -> list:
+        """Файлы, изменившиеся с последней загрузки и с тех пор стабильные."""
+        result = []
+        for path, loaded in self._loaded.items():
+            current = self._signature(path)
+            previous, self._seen[path] = self._seen[path], current
+            if current is not None and current == previous and current != loaded:
+                self._loaded[path] = current
+                result.append(path)
+        return result
+
+
+class HashRing:
+    """
+    Консистентное хеширование адресов по шардам (с виртуальными узлами),
+    чтобы при изменении числа шардов переезжала лишь малая часть аккаунтов.
+    """
+
+    def __init__(self, shards: int, replicas=64):
+        self.shards = shards
+        points = []
+        for shard in range(shards):
+            for replica in range(replicas):
+                points.append((self._hash(f"shard-{shard}-{replica}"), shard))
+        points.sort()
+        self._keys = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.sha1(value.encode()).digest()[:8], "big")
+
+    def shard(self, address: str) -> int:
+        index = bisect.bisect(self._keys, self._hash(address.lower())) % len(self._keys)
+        return self._shards[index]
+
+    def portion(self, items: list, shard: int) -> list:
+        """
+        Доля небольшого списка (прокси) для шарда: элементы упорядочиваются по хешу
+        и раздаются по кругу, поэтому доли отличаются не больше чем на один элемент.
+        Если элементов меньше, чем шардов, шарду без своей доли достаётся весь список.
+        """
+        ordered = sorted(items, key=self._hash)
+        return ordered[shard::self.shards] or ordered
+
+
+class JitterPolicy:
+    """
+    Детерминированный разброс времени задач по аккаунтам: сдвиг в пределах окна
+    считается по хешу адреса и действия и одинаков при каждом запуске.
+    При rate > 0 окно расширяется, чтобы аккаунты начинали одно действие не чаще
+    rate раз в секунду, но не превышает период действия. Сдвиг только откладывает
+    задачу: раньше базового времени (например, конца 24-часового окна узла) она не наступит.
+    """
+
+    def __init__(self, window=1800.0, rate=0.0):
+        self.window = window
+        self.rate = rate
+
+    @staticmethod
+    def fraction(address: str, action: str) -> float:
+        digest = hashlib.sha1(f"{action}:{address.lower()}".encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def span(self, count: int, period=None) -> float:
+        """Ширина окна для count аккаунтов с периодом действия period."""
+        window = self.window
+        if self.rate > 0:
+            window = max(window, count / self.rate)
+        if period:
+            window = min(window, period)
+        return window
+
+    def due(self, address: str, action: str, base: float, count: int, period=None) -> float:
+        return base + self.fraction(address, action) * self.span(count, period)
+
+
+def select_proxy_mode_menu(stdscr):
+    """
+    Интерактивное меню выбора режима работы с прокси.
+    Используйте стрелки ↑/↓ для перемещения и Enter для выбора.
+    """
+    import curses
+
+    curses.curs_set(0)  # скрыть курсор
+    stdscr.clear()
+    options = ["Использовать Monosans Proxy", "Использовать приватные прокси", "Без прокси"]
+    current_selection = 0
+
+    while True:
+        stdscr.clear()
+        stdscr.addstr(0, 0, "Выберите режим работы с прокси (↑/↓ и Enter):")
+        for idx, option in enumerate(options):
+            if idx == current_selection:
+                stdscr.attron(curses.A_REVERSE)
+                stdscr.addstr(idx + 2, 4, option)
+                stdscr.attroff(curses.A_REVERSE)
+            else:
+                stdscr.addstr(idx + 2, 4, option)
+        key = stdscr.getch()
+        if key == curses.KEY_UP and current_selection > 0:
+            current_selection -= 1
+        elif key == curses.KEY_DOWN and current_selection < len(options) - 1:
+            current_selection += 1
+        elif key in [10, 13]:
+            return current_selection + 1  # возвращаем 1, 2 или 3
+
+
+def select_proxy_mode():
+    """Запуск интерактивного меню выбора режима прокси."""
+    import curses
+
+    return curses.wrapper(select_proxy_mode_menu)
+
+
+PROXY_MODES = {"monosans": 1, "private": 2, "none": 3}
+
+DEFAULT_CONFIG = {
+    "proxy_mode": None,
+    "headless": False,
+    "accounts_file": "accounts.txt",
+    "proxy_file": "proxy.txt",
+    "state_file": "state.db",
+    "proxy_cache_file": "proxy_cache.json",
+    "user_agent": None,
+    "api_base": API_BASE,
+    "max_concurrency": 200,
+    "per_proxy_concurrency": 4,
+    "rate": 20.0,
+    "workers": 100,
+    "startup_rate": 20.0,
+    "timeouts": {},
+    "retries": {},
+    "retry_base_delay": 1.0,
+    "retry_factor": 2.0,
+    "retry_max_delay": 30.0,
+    "cache_ttl": None,
+    "sweep_window": 0.0,
+    "sweep_batch": 500,
+    "checkin_interval": 12 * 60 * 60,
+    "earning_interval": 24 * 60 * 60,
+    "spread_window": 30 * 60,
+    "schedule_rate": 0.0,
+    "shards": 1,
+    "dashboard": False,
+    "dashboard_fps": 2.0,
+    "log_level": "info",
+    "log_file": None,
+    "log_console": True,
+    "log_dedupe_window": 60.0,
+    "metrics_host": "127.0.0.1",
+    "metrics_port": None,
+    "shard_index": None,
+    "proxy_download": True,
+    "reload_interval": 10.0,
+    "shutdown_timeout": 30.0,
+    "timeout_factor": 3.0,
+    "min_timeout": 2.0,
+    "connect_timeout": 10.0,
+    "hedge": True,
+    "perf": False,
+    "record_file": None,
+}
+
+# Числовые настройки, которые должны быть больше нуля (делители, размеры пулов, интервалы)
+POSITIVE_KEYS = (
+    "max_concurrency", "per_proxy_concurrency", "rate", "workers", "startup_rate", "sweep_batch",
+    "checkin_interval", "earning_interval", "shards", "dashboard_fps", "min_timeout", "connect_timeout",
+    "retry_base_delay", "retry_factor", "retry_max_delay",
+)
+# Числовые настройки, для которых 0 означает «выключено»
+NON_NEGATIVE_KEYS = (
+    "sweep_window", "spread_window", "schedule_rate", "log_dedupe_window", "reload_interval",
+    "shutdown_timeout", "timeout_factor",
+)
+
+
+def parse_args(argv=None):
+    """Аргументы командной строки; не заданные аргументы равны None и не перекрывают конфиг."""
+    parser = argparse.ArgumentParser(description="LayerEdge Auto-Ping BOT")
+    parser.add_argument("--config", help="JSON-файл с настройками (ключи как в DEFAULT_CONFIG)")
+    parser.add_argument("--proxy-mode", choices=sorted(PROXY_MODES), help="режим прокси; без него показывается меню")
+    parser.add_argument("--headless", action="store_true", default=None,
+                        help="без меню, очистки экрана и баннера (требует --proxy-mode)")
+    parser.add_argument("--accounts-file")
+    parser.add_argument("--proxy-file")
+    parser.add_argument("--state-file")
+    parser.add_argument("--user-agent", help="фиксированный User-Agent (без fake_useragent)")
+    parser.add_argument("--api-base", help="базовый URL API (например, заглушка mock_server.py)")
+    parser.add_argument("--max-concurrency", type=int, help="глобальный лимит запросов в полёте")
+    parser.add_argument("--per-proxy-concurrency", type=int, help="лимит одновременных запросов через прокси")
+    parser.add_argument("--rate", type=float, help="лимит запросов в секунду на эндпоинт")
+    parser.add_argument("--workers", type=int, help="число воркеров планировщика")
+    parser.add_argument("--startup-rate", type=float, help="аккаунтов в секунду при первичной синхронизации")
+    parser.add_argument("--timeout", type=float, help="верхняя граница таймаута запроса для всех эндпоинтов, сек")
+    parser.add_argument("--timeout-factor", type=float,
+                        help="адаптивный таймаут = p99 задержки × factor (0 — фиксированные таймауты)")
+    parser.add_argument("--min-timeout", type=float, help="нижняя граница адаптивного таймаута, сек")
+    parser.add_argument("--connect-timeout", type=float, help="верхняя граница таймаута соединения, сек")
+    parser.add_argument("--no-hedge", dest="hedge", action="store_false", default=None,
+                        help="не дублировать медленные GET-запросы через другой прокси")
+    parser.add_argument("--perf", action="store_true", default=None,
+                        help="режим производительности: uvloop и orjson (если установлены)")
+    parser.add_argument("--record", dest="record_file",
+                        help="запись обменов с API (без ключей и подписей) в трассу для replay.py; .gz — со сжатием")
+    parser.add_argument("--retries", type=int, help="число попыток для всех эндпоинтов")
+    parser.add_argument("--retry-base-delay", type=float, help="задержка перед первым повтором (до джиттера), сек")
+    parser.add_argument("--retry-factor", type=float, help="множитель задержки для каждого следующего повтора")
+    parser.add_argument("--retry-max-delay", type=float, help="верхняя граница задержки между повторами, сек")
+    parser.add_argument("--cache-ttl", type=float, help="время жизни кеша GET-ответов, сек (0 — без кеша)")
+    parser.add_argument("--sweep-window", type=float,
+                        help="пакетный обход: задачи, наступающие в пределах окна, запускаются пачкой по прокси, сек")
+    parser.add_argument("--sweep-batch", type=int, help="максимальный размер пачки при пакетном обходе")
+    parser.add_argument("--checkin-interval", type=float, help="интервал чек-ина, сек")
+    parser.add_argument("--earning-interval", type=float, help="интервал проверки заработка, сек")
+    parser.add_argument("--spread-window", type=float,
+                        help="окно разброса чек-инов, перезапусков узлов и проверок заработка по аккаунтам, сек (0 — без разброса)")
+    parser.add_argument("--schedule-rate", type=float,
+                        help="целевая частота: не больше стольких аккаунтов в секунду на действие (расширяет окно разброса)")
+    parser.add_argument("--dashboard", action="store_true", default=None,
+                        help="curses-панель со сводкой вместо построчного вывода")
+    parser.add_argument("--log-level", choices=sorted(LOG_LEVELS, key=LOG_LEVELS.get), help="минимальный уровень логов")
+    parser.add_argument("--log-file", help="файл для логов в формате JSON lines")
+    parser.add_argument("--quiet", dest="log_console", action="store_false", default=None,
+                        help="не выводить логи в консоль")
+    parser.add_argument("--metrics-port", type=int, help="порт HTTP-эндпоинта /metrics (в шардах: порт + номер шарда)")
+    parser.add_argument("--shards", type=int, help="число процессов-воркеров (аккаунты делятся по адресу)")
+    parser.add_argument("--reload-interval", type=float,
+                        help="период проверки файлов аккаунтов и прокси на изменения, сек (0 — без перезагрузки)")
+    parser.add_argument("--shutdown-timeout", type=float,
+                        help="сколько ждать завершения выполняющихся запросов при остановке, сек")
+    return parser, parser.parse_args(argv)
+
+
+def load_config(argv=None) -> dict:
+    """Настройки: значения по умолчанию < JSON-конфиг < аргументы командной строки."""
+    parser, args = parse_args(argv)
+    config = copy.deepcopy(DEFAULT_CONFIG)
+    if args.config:
+        with open(args.config, 'r') as f:
+            config.update(json.load(f))
+    for key, value in vars(args).items():
+        if value is None or key == "config":
+            continue
+        if key in ("timeout", "retries"):
+            config["timeouts" if key == "timeout" else "retries"] = {name: value for name in ENDPOINTS}
+            continue
+        config[key] = value
+    if config["proxy_mode"] is not None and config["proxy_mode"] not in PROXY_MODES:
+        parser.error(f"неизвестный proxy_mode: {config['proxy_mode']}")
+    if config["headless"] and config["proxy_mode"] is None:
+        parser.error("в режиме --headless нужно указать --proxy-mode")
+
+    def check_number(name, value, allow_zero=False):
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or (value == 0 and not allow_zero):
+            kind = "неотрицательным" if allow_zero else "положительным"
+            parser.error(f"{name} должно быть {kind} числом, получено {value!r}")
+
+    for key in POSITIVE_KEYS:
+        check_number(key, config[key])
+    for key in NON_NEGATIVE_KEYS:
+        check_number(key, config[key], allow_zero=True)
+    for key in ("timeouts", "retries"):
+        for name, value in config[key].items():
+            check_number(f"{key}.{name}", value)
+    if config["cache_ttl"] is not None:
+        check_number("cache_ttl", config["cache_ttl"], allow_zero=True)
+    return config
+
+
+class ResponseCache:
+    """
+    Объединение одинаковых GET-запросов и короткий кеш ответов.
+    Параллельные запросы с одним ключом (эндпоинт, адрес) ждут один общий future;
+    успешный ответ хранится ttl секунд либо до явной инвалидации.
+    """
+
+    def __init__(self):
+        self._values = {}
+        self._inflight = {}
+
+    async def fetch(self, key, ttl: float, factory):
+        """Ответ из кеша, из уже идущего запроса или через factory() -> (status, json)."""
+        entry = self._values.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                return entry[1]
+            del self._values[key]
+        future = self._inflight.get(key)
+        if future is not None:
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Отменён запрос-владелец, а не мы — выполняем запрос сами
+                return await self.fetch(key, ttl, factory)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Исключение уже передано ожидающим; помечаем его обработанным
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(result)
+        if ttl and result[1] is not None:
+            self._values[key] = (time.monotonic() + ttl, result)
+        return result
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self._values.pop(key, None)
+
+    def prune(self):
+        """Удаление устаревших записей."""
+        now = time.monotonic()
+        for key in [key for key, entry in self._values.items() if entry[0] <= now]:
+            del self._values[key]
+
+
+class RetryPolicy:
+    """
+    Экспоненциальная задержка между попытками с "полным" джиттером:
+    delay = random(0, min(max_delay, base_delay * factor ** attempt)).
+    """
+
+    def __init__(self, base_delay=1.0, factor=2.0, max_delay=30.0):
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        """Задержка перед попыткой attempt + 1 (нумерация с нуля)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * self.factor ** attempt))
+
+    @staticmethod
+    def is_transport_error(error: Exception) -> bool:
+        """Таймаут, обрыв соединения или ошибка прокси (ответ сервера не получен)."""
+        return isinstance(error, (asyncio.TimeoutError, ClientConnectionError,
+                                  ProxyError, ProxyConnectionError, ProxyTimeoutError))
+
+    @staticmethod
+    def classify(error: Exception) -> str:
+        """Класс ошибки для метрик."""
+        if isinstance(error, asyncio.TimeoutError):
+            return "timeout"
+        if isinstance(error, (ProxyError, ProxyConnectionError, ProxyTimeoutError)):
+            return "proxy"
+        if isinstance(error, ClientConnectionError):
+            return "connection"
+        if isinstance(error, ClientResponseError):
+            if error.status == 429:
+                return "http_429"
+            if error.status >= 500:
+                return "http_5xx"
+            if error.status >= 400:
+                return "http_4xx"
+            return "invalid_response"
+        return "other"
+
+    @classmethod
+    def is_retryable(cls, error: Exception) -> bool:
+        """
+        Классификация ошибок:
+         - таймауты, обрывы соединения и ошибки прокси — повторяемые;
+         - HTTP 5xx и 429 — повторяемые, прочие 4xx — окончательные;
+         - ответ 2xx с некорректным телом (например, HTML от прокси) — повторяемый.
+        """
+        if cls.is_transport_error(error):
+            return True
+        if isinstance(error, ClientResponseError):
+            return error.status >= 500 or error.status == 429 or error.status < 400
+        return False
+
+
+class AdaptiveTimeouts:
+    """
+    Адаптивные таймауты по наблюдаемым задержкам вместо фиксированных 60/120 секунд.
+    Для каждого эндпоинта хранится скользящее окно задержек до ответа, для установки
+    соединения (включая рукопожатие с прокси) — общее окно. Бюджет — p99 × factor,
+    ограниченный снизу min_timeout (connect — min_connect) и сверху endpoint.timeout
+    (connect — connect_timeout). Пока данных меньше min_samples, действуют верхние границы.
+    Попытки, прерванные по таймауту, тоже попадают в окно (с задержкой, равной бюджету),
+    а после каждого таймаута подряд бюджет удваивается до верхней границы: иначе при
+    замедлении API успешных ответов не будет и бюджет навсегда останется прежним.
+    """
+
+    def __init__(self, factor=3.0, min_timeout=2.0, connect_timeout=10.0, min_connect=1.0,
+                 window=500, min_samples=20):
+        self.factor = factor
+        self.min_timeout = min_timeout
+        self.connect_timeout = connect_timeout
+        self.min_connect = min_connect
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._counts = {}
+        self._p99 = {}
+        self._streaks = {}
+
+    def observe(self, key: str, latency: float, timed_out=False):
+        """
+        Учёт задержки для key (имя эндпоинта или "connect"). timed_out — попытка
+        прервана по таймауту, latency — её бюджет; перцентиль тогда пересчитывается сразу.
+        """
+        samples = self._samples.get(key)
+        if samples is None:
+            samples = self._samples[key] = deque(maxlen=self.window)
+        samples.append(latency)
+        self._streaks[key] = self._streaks.get(key, 0) + 1 if timed_out else 0
+        count = self._counts[key] = self._counts.get(key, 0) + 1
+        # Перцентиль пересчитывается не на каждый запрос, а раз в 10 наблюдений
+        if len(samples) >= self.min_samples and (key not in self._p99 or count % 10 == 0 or timed_out):
+            ordered = sorted(samples)
+            self._p99[key] = ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))]
+
+    def _scaled(self, key: str, budget: float, upper: float) -> float:
+        """Бюджет с удвоением за каждый таймаут подряд, не больше upper."""
+        streak = self._streaks.get(key, 0)
+        return min(upper, budget * 2 ** min(streak, 16))
+
+    def p99(self, key: str):
+        """p99 задержки или None, если наблюдений пока мало."""
+        return self._p99.get(key)
+
+    def budget(self, endpoint, proxy_latency=None) -> float:
+        """Бюджет ожидания ответа: p99 эндпоинта (или оценка прокси, если она хуже) × factor."""
+        if self.factor <= 0:
+            return endpoint.timeout
+        p99 = self._p99.get(endpoint.name)
+        if p99 is None:
+            return endpoint.timeout
+        if proxy_latency is not None:
+            p99 = max(p99, proxy_latency)
+        return self._scaled(endpoint.name, max(self.min_timeout, p99 * self.factor), endpoint.timeout)
+
+    def connect_budget(self) -> float:
+        p99 = self._p99.get("connect")
+        if self.factor <= 0 or p99 is None:
+            return self.connect_timeout
+        return self._scaled("connect", max(self.min_connect, p99 * self.factor), self.connect_timeout)
+
+    def timeout(self, endpoint, proxy_latency=None) -> ClientTimeout:
+        """
+        Раздельные таймауты: соединение (sock_connect), ожидание данных (sock_read)
+        и общий (total = соединение + ответ, не больше endpoint.timeout).
+        """
+        read = self.budget(endpoint, proxy_latency)
+        connect = self.connect_budget()
+        return ClientTimeout(total=min(endpoint.timeout, read + connect), sock_connect=connect, sock_read=read)
+
+
+class Endpoint:
+    """
+    Описание эндпоинта API: метод, шаблон URL, бюджет таймаута и повторов,
+    статусы, которые возвращаются вызывающему коду без ошибки, текст ошибки для лога
+    и время жизни кешированного ответа (только для GET, 0 — без кеша).
+    """
+
+    def __init__(self, name, method, path, timeout, retries=5, passthrough=(), error_message="Ошибка запроса",
+                 cache_ttl=0.0):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.timeout = timeout
+        self.retries = retries
+        self.passthrough = frozenset(passthrough)
+        self.error_message = error_message
+        self.cache_ttl = cache_ttl
+
+    def url(self, base: str, **params) -> str:
+        return base + self.path.format(**params)
+
+
+ENDPOINTS = {
+    "user_data": Endpoint(
+        "user_data", "GET", "/referral/wallet-details/{address}", timeout=60,
+        passthrough=(404,), error_message="Ошибка получения данных", cache_ttl=30
+    ),
+    "user_confirm": Endpoint(
+        "user_confirm", "POST", "/referral/register-wallet/tHc67a1g", timeout=60,
+        error_message="Ошибка регистрации"
+    ),
+    "daily_checkin": Endpoint(
+        "daily_checkin", "POST", "/light-node/claim-node-points", timeout=120,
+        passthrough=(405,), error_message="Ошибка чек-ина"
+    ),
+    "node_status": Endpoint(
+        "node_status", "GET", "/light-node/node-status/{address}", timeout=120,
+        error_message="Ошибка получения статуса узла", cache_ttl=30
+    ),
+    "start_node": Endpoint(
+        "start_node", "POST", "/light-node/node-action/{address}/start", timeout=120,
+        error_message="Ошибка запуска узла"
+    ),
+    "stop_node": Endpoint(
+        "stop_node", "POST", "/light-node/node-action/{address}/stop", timeout=120,
+        error_message="Ошибка остановки узла"
+    ),
+}
+
+
+class ProxyStats:
+    """Статистика прокси: успехи/ошибки, EWMA задержки, карантин и число назначенных аккаунтов."""
+
+    __slots__ = (
+        "successes", "failures", "consecutive_failures", "latency", "deviation", "quarantined_until", "assigned",
+    )
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None
+        self.deviation = 0.0
+        self.quarantined_until = 0.0
+        self.assigned = 0
+
+    def score(self) -> float:
+        """Чем выше, тем лучше: доля успехов (со сглаживанием) / задержка / нагрузка."""
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        latency = self.latency if self.latency is not None else 1.0
+        return success_rate / (latency * (1 + self.assigned))
+
+
+class ProxyPool:
+    """
+    Пул прокси с оценкой здоровья. Для каждого прокси учитываются доля успехов,
+    EWMA задержки и серия ошибок подряд; после failure_threshold ошибок подряд
+    прокси уходит в карантин (cooldown удваивается с каждой новой ошибкой).
+    Выбор — "power of two choices" по score среди здоровых прокси.
+    """
+
+    def __init__(self, failure_threshold=3, cooldown=60.0, max_cooldown=3600.0, alpha=0.3):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.alpha = alpha
+        self._proxies = []
+        self._stats = {}
+
+    def __len__(self):
+        return len(self._proxies)
+
+    def __contains__(self, proxy):
+        return proxy in self._stats
+
+    def __iter__(self):
+        return iter(list(self._proxies))
+
+    def update(self, proxies):
+        """Замена списка прокси; статистика уже известных прокси сохраняется."""
+        unique = list(dict.fromkeys(proxies))
+        self._stats = {proxy: self._stats.get(proxy) or ProxyStats() for proxy in unique}
+        self._proxies = unique
+
+    def add(self, proxy):
+        """Добавление прокси в пул (повторное добавление игнорируется)."""
+        if proxy not in self._stats:
+            self._stats[proxy] = ProxyStats()
+            self._proxies.append(proxy)
+
+    def remove(self, proxies):
+        """
+        Удаление прокси из пула. Аккаунты, закреплённые за удалённым прокси,
+        получат новый при следующем запросе (удалённый прокси считается нездоровым).
+        """
+        removed = set(proxies) & self._stats.keys()
+        if not removed:
+            return
+        for proxy in removed:
+            del self._stats[proxy]
+        self._proxies = [proxy for proxy in self._proxies if proxy not in removed]
+
+    def is_healthy(self, proxy, now=None) -> bool:
+        stats = self._stats.get(proxy)
+        if stats is None:
+            return False
+        return stats.quarantined_until <= (now if now is not None else time.time())
+
+    def choose(self, exclude=None):
+        """Выбор прокси для аккаунта; None, если пул пуст."""
+        if not self._proxies:
+            return None
+        now = time.time()
+        candidates = []
+        for _ in range(8):
+            proxy = random.choice(self._proxies)
+            if proxy != exclude and proxy not in candidates and self.is_healthy(proxy, now):
+                candidates.append(proxy)
+                if len(candidates) == 2:
+                    break
+        if not candidates:
+            candidates = [p for p in self._proxies if p != exclude and self.is_healthy(p, now)]
+        if not candidates:
+            # Все прокси в карантине — берём тот, что освободится раньше всех
+            candidates = [min(self._proxies, key=lambda p: self._stats[p].quarantined_until)]
+        return max(candidates, key=lambda p: self._stats[p].score())
+
+    def assign(self, proxy):
+        stats = self._stats.get(proxy)
+        if stats is not None:
+            stats.assigned += 1
+
+    def release(self, proxy):
+        stats = self._stats.get(proxy)
+        if stats is not None and stats.assigned > 0:
+            stats.assigned -= 1
+
+    def record(self, proxy, ok: bool, latency=None):
+        """Учёт результата запроса через прокси."""
+        stats = self._stats.get(proxy)
+        if stats is None:
+            return
+        if ok:
+            stats.successes += 1
+            stats.consecutive_failures = 0
+            stats.quarantined_until = 0.0
+            if latency is not None:
+                if stats.latency is None:
+                    stats.latency = latency
+                else:
+                    stats.deviation = self.alpha * abs(latency - stats.latency) + (1 - self.alpha) * stats.deviation
+                    stats.latency = self.alpha * latency + (1 - self.alpha) * stats.latency
+            return
+        stats.failures += 1
+        stats.consecutive_failures += 1
+        overflow = stats.consecutive_failures - self.failure_threshold
+        if overflow >= 0:
+            cooldown = min(self.max_cooldown, self.cooldown * 2 ** min(overflow, 16))
+            stats.quarantined_until = time.time() + cooldown
+
+    def latency_bound(self, proxy):
+        """
+        Оценка «медленного» ответа через прокси по EWMA задержки и её отклонения
+        (≈ p99 при нормальном распределении); None, если прокси ещё не отвечал.
+        """
+        stats = self._stats.get(proxy)
+        if stats is None or stats.latency is None:
+            return None
+        return stats.latency + 3 * stats.deviation
+
+    def worst(self, count: int) -> list:
+        """count прокси с наибольшим числом ошибок: [(proxy, ProxyStats)]."""
+        failing = ((proxy, s) for proxy, s in self._stats.items() if s.failures)
+        return heapq.nlargest(count, failing, key=lambda item: (item[1].failures, item[1].consecutive_failures))
+
+    def stats(self) -> list:
+        """Статистика по всем прокси, самые проблемные — первыми."""
+        now = time.time()
+        rows = [
+            {
+                "proxy": proxy,
+                "successes": s.successes,
+                "failures": s.failures,
+                "consecutive_failures": s.consecutive_failures,
+                "latency": s.latency,
+                "assigned": s.assigned,
+                "quarantined": s.quarantined_until > now,
+                "score": s.score(),
+            }
+            for proxy, s in self._stats.items()
+        ]
+        rows.sort(key=lambda row: (-row["failures"], row["score"]))
+        return rows
+
+
+class ProxyValidator:
+    """
+    Предварительная проверка списка прокси перед запуском аккаунтов.
+    Каждый прокси проверяется быстрым запросом с коротким таймаутом (соединение
+    через прокси + TLS до API); одновременно выполняется не более concurrency проверок.
+    Результаты кешируются на диске на ttl секунд, чтобы не перепроверять их после перезапуска.
+    """
+
+    def __init__(self, cache_path="proxy_cache.json", ttl=6 * 60 * 60, concurrency=200,
+                 timeout=5.0, probe_url="https://referralapi.layeredge.io/"):
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.probe_url = probe_url
+        self._cache = {}
+
+    def load_cache(self):
+        """
+        Загрузка кеша {proxy: [checked_at, latency | null]}; устаревшие записи отбрасываются.
+        Результаты в памяти (в том числе идущей параллельно проверки) не теряются:
+        из двух записей одного прокси остаётся более свежая.
+        """
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        for proxy, entry in self._cache.items():
+            if proxy not in cache or cache[proxy][0] < entry[0]:
+                cache[proxy] = entry
+        deadline = time.time() - self.ttl
+        self._cache = {proxy: entry for proxy, entry in cache.items() if entry[0] >= deadline}
+
+    def save_cache(self):
+        # Временный файл у каждого процесса свой, как у AddressCache
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    async def probe(self, proxy: str):
+        """Проверка прокси; возвращает задержку в секундах или None, если прокси не работает."""
+        started = time.monotonic()
+        try:
+            async with ClientSession(
+                connector=ProxyConnector.from_url(proxy), timeout=ClientTimeout(total=self.timeout)
+            ) as session:
+                async with session.head(self.probe_url, allow_redirects=False):
+                    return time.monotonic() - started
+        except Exception:
+            return None
+
+    async def validate(self, proxies, on_valid):
+        """
+        Проверка прокси (уже нормализованных и без дублей) с потоковой выдачей:
+        on_valid(proxy, latency) вызывается сразу, как только прокси прошёл проверку.
+        Возвращает число рабочих прокси.
+        """
+        self.load_cache()
+        pending = []
+        valid = 0
+        for proxy in proxies:
+            entry = self._cache.get(proxy)
+            if entry is None:
+                pending.append(proxy)
+            elif entry[1] is not None:
+                valid += 1
+                on_valid(proxy, entry[1])
+
+        queue = iter(pending)
+
+        async def worker():
+            nonlocal valid
+            for proxy in queue:
+                latency = await self.probe(proxy)
+                self._cache[proxy] = [time.time(), latency]
+                if latency is not None:
+                    valid += 1
+                    on_valid(proxy, latency)
+
+        workers = min(self.concurrency, len(pending))
+        try:
+            await asyncio.gather(*(worker() for _ in range(workers)))
+        finally:
+            self.save_cache()
+        return valid
+
+
+class TokenBucket:
+    """Клиентский token bucket: rate запросов в секунду с запасом capacity."""
+
+    def __init__(self, rate: float, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self):
+        """
+        Списание одного токена с ожиданием своей очереди. Токен резервируется сразу
+        (баланс может уйти в минус), и каждый вызов спит ровно до своего момента —
+        без опроса, при котором все ожидающие просыпались ради одного токена.
+        Отменённый вызов (запасной hedge-запрос, остановка) возвращает резерв.
+        """
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            try:
+                await asyncio.sleep(-self._tokens / self.rate)
+            except asyncio.CancelledError:
+                self._tokens += 1
+                raise
+
+
+class RequestLimiter:
+    """
+    Ограничение исходящих запросов, общее для всех методов API:
+     - глобальный семафор на число запросов в полёте;
+     - лимит одновременных запросов через один прокси;
+     - token bucket на каждый эндпоинт (rate запросов в секунду).
+    """
+
+    def __init__(self, max_concurrency=200, per_proxy=4, rate=20.0, rates=None):
+        self.max_concurrency = max_concurrency
+        self.per_proxy = per_proxy
+        self.rate = rate
+        self.rates = dict(rates or {})
+        self._global = None
+        self._proxies = {}
+        self._buckets = {}
+
+    def bucket(self, name: str) -> TokenBucket:
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            bucket = self._buckets[name] = TokenBucket(self.rates.get(name, self.rate))
+        return bucket
+
+    def _proxy_semaphore(self, proxy):
+        semaphore = self._proxies.get(proxy)
+        if semaphore is None:
+            semaphore = self._proxies[proxy] = asyncio.Semaphore(self.per_proxy)
+        return semaphore
+
+    @contextlib.asynccontextmanager
+    async def slot(self, name: str, proxy=None):
+        """
+        Слот на один запрос к эндпоинту name через proxy (None — без лимита на прокси).
+        Токен эндпоинта берётся до слотов конкурентности: очередь к одному эндпоинту
+        не должна держать слоты прокси и глобальные слоты, нужные остальным эндпоинтам.
+        """
+        # Семафоры создаются внутри работающего цикла событий
+        if self._global is None:
+            self._global = asyncio.Semaphore(self.max_concurrency)
+        await self.bucket(name).acquire()
+        async with self._global:
+            if proxy is None:
+                yield
+                return
+            async with self._proxy_semaphore(proxy):
+                yield
+
+
+class Metrics:
+    """
+    Минимальный реестр метрик в текстовом формате Prometheus: счётчики,
+    gauge и гистограммы с метками. collectors вызываются перед каждой выдачей,
+    чтобы обновить gauge, которые дешевле считать по запросу (очередь, прокси).
+    """
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self):
+        self._meta = {}
+        self._values = {}
+        self._buckets = {}
+        self.collectors = []
+
+    def describe(self, name: str, kind: str, help_text: str, buckets=None):
+        self._meta[name] = (kind, help_text)
+        self._values.setdefault(name, {})
+        if kind == "histogram":
+            self._buckets[name] = tuple(buckets or self.DEFAULT_BUCKETS)
+
+    def inc(self, name: str, labels=(), value=1.0):
+        series = self._values[name]
+        series[labels] = series.get(labels, 0.0) + value
+
+    def set(self, name: str, value, labels=()):
+        self._values[name][labels] = value
+
+    def clear(self, name: str):
+        self._values[name].clear()
+
+    def observe(self, name: str, value: float, labels=()):
+        series = self._values[name]
+        buckets = self._buckets[name]
+        entry = series.get(labels)
+        if entry is None:
+            entry = series[labels] = [0] * len(buckets) + [0.0, 0]
+        index = bisect.bisect_left(buckets, value)
+        if index < len(buckets):
+            entry[index] += 1
+        entry[-2] += value
+        entry[-1] += 1
+
+    @staticmethod
+    def _labels(labels, extra=()) -> str:
+        pairs = tuple(labels) + tuple(extra)
+        if not pairs:
+            return ""
+        body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for name, (kind, help_text) in self._meta.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in self._values[name].items():
+                if kind != "histogram":
+                    lines.append(f"{name}{self._labels(labels)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(self._buckets[name], value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{self._labels(labels, (('le', bound),))} {cumulative}")
+                lines.append(f"{name}_bucket{self._labels(labels, (('le', '+Inf'),))} {value[-1]}")
+                lines.append(f"{name}_sum{self._labels(labels)} {value[-2]}")
+                lines.append(f"{name}_count{self._labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str, port: int):
+        """Запуск HTTP-эндпоинта /metrics; возвращает AppRunner для остановки."""
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+        app = web.Application()
+        app.router.add_get("/metrics", handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+
+class AccountState:
+    """
+    Компактная запись состояния аккаунта. Хранится в планировщике вместо
+    долгоживущих корутин: номер аккаунта в реестре и данные, полученные от сервера.
+    Ключ, адрес и прокси хранятся в AccountRegistry и читаются по номеру.
+    """
+
+    __slots__ = (
+        "registry", "index", "node_start", "last_checkin", "node_points", "registered", "sync_attempts",
+        "node_status", "checkin_status", "failing", "retired",
+    )
+
+    def __init__(self, registry, index: int):
+        self.registry = registry
+        self.index = index
+        self.retired = False
+        self.node_start = None
+        self.last_checkin = None
+        self.node_points = None
+        self.registered = False
+        self.sync_attempts = 0
+        self.node_status = "unknown"
+        self.checkin_status = "pending"
+        self.failing = False
+
+    @property
+    def account(self) -> str:
+        return self.registry.key(self.index)
+
+    @property
+    def address(self) -> str:
+        return self.registry.address(self.index)
+
+    @property
+    def proxy(self):
+        return self.registry.proxy(self.index)
+
+    @proxy.setter
+    def proxy(self, proxy):
+        self.registry.set_proxy(self.index, proxy)
+
+
+class ProxyTable:
+    """Таблица интернированных прокси: каждая строка хранится один раз, аккаунты ссылаются на неё по номеру."""
+
+    def __init__(self):
+        self.urls = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.urls)
+
+    def intern(self, proxy: str) -> int:
+        proxy_id = self._ids.get(proxy)
+        if proxy_id is None:
+            proxy_id = self._ids[proxy] = len(self.urls)
+            self.urls.append(proxy)
+        return proxy_id
+
+    def url(self, proxy_id: int) -> str:
+        return self.urls[proxy_id]
+
+
+class AccountRegistry:
+    """
+    Реестр аккаунтов для больших списков кошельков. Данные хранятся столбцами:
+    ключи (32 байта) и адреса (20 байт) подряд в bytearray, прокси — номером
+    в ProxyTable (array 'i', -1 — не назначен). Строки ключа и адреса с checksum
+    собираются только при обращении. Аккаунты, убранные из файла, выводятся
+    из работы (retire); их строки остаются в столбцах до перезапуска.
+    """
+
+    KEY_SIZE = 32
+    ADDRESS_SIZE = 20
+    NO_PROXY = -1
+
+    def __init__(self):
+        self.proxies = ProxyTable()
+        self._keys = bytearray()
+        self._addresses = bytearray()
+        self._proxy_ids = array("i")
+        self._states = []
+
+    def __len__(self):
+        return len(self._proxy_ids)
+
+    @staticmethod
+    def _unhex(value: str, size: int) -> bytes:
+        value = value[2:] if value[:2].lower() == "0x" else value
+        raw = bytes.fromhex(value)
+        if len(raw) != size:
+            raise ValueError(f"expected {size} bytes, got {len(raw)}")
+        return raw
+
+    def add(self, account: str, address: str) -> AccountState:
+        """Добавление аккаунта; возвращается его запись состояния."""
+        key = self._unhex(account, self.KEY_SIZE)
+        address = self._unhex(address, self.ADDRESS_SIZE)
+        index = len(self._proxy_ids)
+        self._keys += key
+        self._addresses += address
+        self._proxy_ids.append(self.NO_PROXY)
+        state = AccountState(self, index)
+        self._states.append(state)
+        return state
+
+    def retire(self, state: AccountState):
+        """Вывод аккаунта из работы: задачи в планировщике пропускаются, прокси освобождается."""
+        state.retired = True
+        self._states[state.index] = None
+        self.set_proxy(state.index, None)
+
+    def states(self):
+        """Записи действующих аккаунтов."""
+        return (state for state in self._states if state is not None)
+
+    def key(self, index: int) -> str:
+        start = index * self.KEY_SIZE
+        return "0x" + self._keys[start:start + self.KEY_SIZE].hex()
+
+    def address(self, index: int) -> str:
+        from eth_utils import to_checksum_address
+
+        start = index * self.ADDRESS_SIZE
+        return to_checksum_address(bytes(self._addresses[start:start + self.ADDRESS_SIZE]))
+
+    def proxy(self, index: int):
+        proxy_id = self._proxy_ids[index]
+        return None if proxy_id == self.NO_PROXY else self.proxies.url(proxy_id)
+
+    def set_proxy(self, index: int, proxy):
+        self._proxy_ids[index] = self.NO_PROXY if proxy is None else self.proxies.intern(proxy)
+
+    def nbytes(self) -> int:
+        """Объём столбцов реестра в байтах (без записей состояния и строк прокси)."""
+        return len(self._keys) + len(self._addresses) + self._proxy_ids.itemsize * len(self._proxy_ids)
+
+
+class StatusBoard:
+    """
+    Счётчики аккаунтов по состояниям (узел, чек-ин, ошибки). Обновляются
+    инкрементально при смене состояния, поэтому чтение сводки не зависит от числа аккаунтов.
+    """
+
+    FIELDS = ("node_status", "checkin_status", "failing")
+
+    def __init__(self):
+        self.counts = {field: {} for field in self.FIELDS}
+
+    def add(self, state: AccountState):
+        for field in self.FIELDS:
+            value = getattr(state, field)
+            self.counts[field][value] = self.counts[field].get(value, 0) + 1
+
+    def remove(self, state: AccountState):
+        for field in self.FIELDS:
+            self.counts[field][getattr(state, field)] -= 1
+
+    def set(self, state: AccountState, field: str, value):
+        old = getattr(state, field)
+        if old == value:
+            return
+        if state.retired:
+            # Аккаунт уже снят со счётчиков (remove), завершается его последняя задача
+            setattr(state, field, value)
+            return
+        counts = self.counts[field]
+        counts[old] -= 1
+        counts[value] = counts.get(value, 0) + 1
+        setattr(state, field, value)
+
+    def count(self, field: str, value) -> int:
+        return self.counts[field].get(value, 0)
+
+
+class StateStore:
+    """
+    Локальное хранилище состояния аккаунтов (SQLite в режиме WAL).
+    Позволяет после перезапуска продолжить расписание без повторного опроса API.
+    Запись буферизуется: commit выполняется пачкой раз в commit_interval секунд.
+    """
+
+    def __init__(self, path="state.db", commit_interval=5.0):
+        self.path = path
+        self.commit_interval = commit_interval
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS accounts ("
+            " address TEXT PRIMARY KEY,"
+            " last_checkin REAL,"
+            " node_start INTEGER,"
+            " node_points REAL,"
+            " registered INTEGER NOT NULL DEFAULT 0,"
+            " proxy TEXT,"
+            " updated REAL NOT NULL)"
+        )
+        # Контрольная точка расписания, записанная при штатной остановке
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS schedule ("
+            " address TEXT NOT NULL,"
+            " action TEXT NOT NULL,"
+            " due REAL NOT NULL,"
+            " PRIMARY KEY (address, action))"
+        )
+        self._conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def load(self) -> dict:
+        """Все сохранённые записи: address -> dict (schedule — контрольная точка {action: due})."""
+        cursor = self._conn.execute(
+            "SELECT address, last_checkin, node_start, node_points, registered, proxy FROM accounts"
+        )
+        saved = {
+            row[0]: {
+                "last_checkin": row[1],
+                "node_start": row[2],
+                "node_points": row[3],
+                "registered": bool(row[4]),
+                "proxy": row[5],
+                "schedule": {},
+            }
+            for row in cursor
+        }
+        for address, action, due in self._conn.execute("SELECT address, action, due FROM schedule"):
+            if address in saved:
+                saved[address]["schedule"][action] = due
+        return saved
+
+    def save_schedule(self, rows):
+        """Запись контрольной точки расписания: rows — (address, action, due); старая точка заменяется."""
+        self._conn.execute("DELETE FROM schedule")
+        self._conn.executemany("INSERT OR REPLACE INTO schedule (address, action, due) VALUES (?, ?, ?)", rows)
+        self._conn.commit()
+        self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def clear_schedule(self):
+        """
+        Сброс контрольной точки после восстановления: если следующая остановка
+        будет аварийной, расписание считается заново, а не по устаревшей точке.
+        """
+        self._conn.execute("DELETE FROM schedule")
+        self._conn.commit()
+
+    def save(self, state, proxy=None):
+        """Сохранение (upsert) состояния аккаунта."""
+        self._conn.execute(
+            "INSERT INTO accounts (address, last_checkin, node_start, node_points, registered, proxy, updated)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT(address) DO UPDATE SET"
+            " last_checkin=excluded.last_checkin, node_start=excluded.node_start,"
+            " node_points=excluded.node_points, registered=excluded.registered,"
+            " proxy=excluded.proxy, updated=excluded.updated",
+            (state.address, state.last_checkin, state.node_start, state.node_points,
+             int(state.registered), proxy, time.time())
+        )
+        self._pending += 1
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            self.flush()
+
+    def flush(self):
+        """Фиксация накопленных изменений."""
+        if self._pending:
+            self._conn.commit()
+            self._pending = 0
+        self._last_commit = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self._conn.close()
+
+
+class Scheduler:
+    """
+    Центральный планировщик задач на min-куче (due_time, seq, state, action).
+    Наступившие задачи раздаются ограниченному пулу воркеров через очередь;
+    обработчик действия возвращает время следующего запуска (или None).
+    При sweep_window > 0 задачи забираются пачками и сортируются по sweep_key(state).
+    Задачи аккаунтов, выведенных из работы (state.retired), пропускаются.
+    shutdown() останавливает выдачу задач и дожидается выполняющихся; всё
+    невыполненное остаётся в куче и доступно через jobs() для контрольной точки.
+    """
+
+    def __init__(self, workers=100, error_delay=60, on_error=None, on_start=None,
+                 sweep_window=0.0, sweep_batch=500, sweep_key=None):
+        self.workers = workers
+        self.error_delay = error_delay
+        self.on_error = on_error
+        self.on_start = on_start
+        self.sweep_window = sweep_window
+        self.sweep_batch = sweep_batch
+        self.sweep_key = sweep_key
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup = None
+        self._queue = None
+        self._dispatcher = None
+        self._workers = []
+        self._busy = {}
+        self.stopping = False
 
+    def __len__(self):
+        return len(self._heap)
 
-def select_proxy_mode_menu(stdscr):
+    def schedule(self, due: float, state: AccountState, action: str):
+        """Добавление задачи action для аккаунта на момент due (unix time)."""
+        if state.retired:
+            return
+        entry = (due, next(self._seq), state, action)
+        heapq.heappush(self._heap, entry)
+        # Будим диспетчер, только если новая задача стала ближайшей
+        if self._wakeup is not None and self._heap[0] is entry:
+            self._wakeup.set()
+
+    def peek(self):
+        """Ближайшая задача (due, state, action) или None."""
+        if not self._heap:
+            return None
+        due, _, state, action = self._heap[0]
+        return due, state, action
+
+    async def _dispatch(self):
+        while True:
+            if not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if not self.sweep_window:
+                due, _, state, action = heapq.heappop(self._heap)
+                if not state.retired:
+                    await self._put([(due, state, action)])
+                continue
+            # Пакетный обход: забираем задачи, наступающие в пределах окна, и отдаём
+            # их сгруппированными по ключу (прокси), чтобы соединения переиспользовались подряд
+            horizon = time.time() + self.sweep_window
+            batch = []
+            while self._heap and self._heap[0][0] <= horizon and len(batch) < self.sweep_batch:
+                due, _, state, action = heapq.heappop(self._heap)
+                if not state.retired:
+                    batch.append((due, state, action))
+            if self.sweep_key is not None:
+                batch.sort(key=lambda job: self.sweep_key(job[1]))
+            await self._put(batch)
+
+    async def _put(self, jobs: list):
+        """Передача задач воркерам; при остановке диспетчера неотданные задачи возвращаются в кучу."""
+        for index, job in enumerate(jobs):
+            try:
+                await self._queue.put(job)
+            except asyncio.CancelledError:
+                self._requeue(jobs[index:])
+                raise
+
+    def _requeue(self, jobs):
+        for due, state, action in jobs:
+            self.schedule(due, state, action)
+
+    def jobs(self):
+        """Все запланированные задачи (due, state, action) в порядке кучи."""
+        return ((due, state, action) for due, _, state, action in self._heap)
+
+    def upcoming(self, count: int) -> list:
+        """
+        Ближайшие count задач (due, state, action). k наименьших элементов кучи
+        лежат в первых 2**k - 1 позициях массива, поэтому сканируется лишь его начало.
+        """
+        head = sorted(self._heap[:2 ** count - 1])[:count]
+        return [(due, state, action) for due, _, state, action in head]
+
+    def queue_depth(self) -> int:
+        """Число наступивших задач, ожидающих свободного воркера."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self, handlers):
+        task = asyncio.current_task()
+        while not self.stopping:
+            job = await self._queue.get()
+            if job is None:
+                # Сигнал остановки от shutdown()
+                self._queue.task_done()
+                return
+            due, state, action = job
+            self._busy[task] = job
+            if self.on_start is not None:
+                self.on_start(action, time.time() - due)
+            try:
+                next_due = await handlers[action](state)
+            except Exception as e:
+                if self.on_error is not None:
+                    self.on_error(state, action, e)
+                next_due = time.time() + self.error_delay
+            finally:
+                self._queue.task_done()
+            del self._busy[task]
+            if next_due is not None:
+                self.schedule(next_due, state, action)
+
+    async def run(self, handlers: dict):
+        """Запуск диспетчера и пула воркеров; handlers: action -> async (state) -> next_due."""
+        self._wakeup = asyncio.Event()
+        self._queue = asyncio.Queue(maxsize=self.workers)
+        if self._heap:
+            self._wakeup.set()
+        self._workers = [asyncio.ensure_future(self._worker(handlers)) for _ in range(self.workers)]
+        self._dispatcher = asyncio.ensure_future(self._dispatch())
+        tasks = self._workers + [self._dispatcher]
+        try:
+            # Завершение — после shutdown(), когда остановлены все воркеры и диспетчер
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if not task.cancelled() and task.exception() is not None:
+                    raise task.exception()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def in_flight(self) -> int:
+        """Число выполняющихся задач."""
+        return len(self._busy)
+
+    async def shutdown(self, timeout: float) -> int:
+        """
+        Остановка: новые задачи не выдаются, выполняющиеся получают timeout секунд
+        на завершение. Не успевшие задачи прерываются и возвращаются в кучу на текущий
+        момент — при следующем запуске они выполнятся первыми. Возвращает число прерванных задач.
+        """
+        self.stopping = True
+        if self._dispatcher is None:
+            return 0
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        # Задачи, отданные в очередь, но ещё не взятые воркерами, возвращаются в кучу
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            self._queue.task_done()
+            if job is not None:
+                self._requeue([job])
+        for _ in self._workers:
+            if self._queue.full():
+                break
+            self._queue.put_nowait(None)
+
+        if self._busy:
+            await asyncio.wait(list(self._busy), timeout=timeout)
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Завершившиеся задачи сами убирают себя из _busy; остались только прерванные
+        interrupted = list(self._busy.values())
+        self._busy.clear()
+        now = time.time()
+        for _, state, action in interrupted:
+            self.schedule(now, state, action)
+        return len(interrupted)
+
+
+class Dashboard:
     """
-    Интерактивное меню выбора режима работы с прокси.
-    Используйте стрелки ↑/↓ для перемещения и Enter для выбора.
+    Curses-панель вместо построчного вывода: перерисовывается с частотой fps
+    по агрегатам в памяти (StatusBoard, счётчики запросов, вершина кучи планировщика),
+    поэтому стоимость кадра не зависит от числа аккаунтов. Проблемные прокси
+    пересчитываются раз в proxy_refresh секунд. Клавиша q — выход.
     """
-    curses.curs_set(0)  # скрыть курсор
-    stdscr.clear()
-    options = ["Использовать Monosans Proxy", "Использовать приватные прокси", "Без прокси"]
-    current_selection = 0
 
-    while True:
-        stdscr.clear()
-        stdscr.addstr(0, 0, "Выберите режим работы с прокси (↑/↓ и Enter):")
-        for idx, option in enumerate(options):
-            if idx == current_selection:
-                stdscr.attron(curses.A_REVERSE)
-                stdscr.addstr(idx + 2, 4, option)
-                stdscr.attroff(curses.A_REVERSE)
-            else:
-                stdscr.addstr(idx + 2, 4, option)
-        key = stdscr.getch()
-        if key == curses.KEY_UP and current_selection > 0:
-            current_selection -= 1
-        elif key == curses.KEY_DOWN and current_selection < len(options) - 1:
-            current_selection += 1
-        elif key in [10, 13]:
-            return current_selection + 1  # возвращаем 1, 2 или 3
+    def __init__(self, bot, fps=2.0, proxy_refresh=5.0):
+        self.bot = bot
+        self.fps = fps
+        self.proxy_refresh = proxy_refresh
+        self._rates = (time.monotonic(), 0, 0)
+        self._request_rate = 0.0
+        self._error_rate = 0.0
+        self._proxies = []
+        self._proxies_at = 0.0
 
+    def _update_rates(self):
+        now = time.monotonic()
+        started, requests, failures = self._rates
+        elapsed = now - started
+        if elapsed >= 1.0:
+            self._request_rate = (self.bot.request_count - requests) / elapsed
+            self._error_rate = (self.bot.failure_count - failures) / elapsed
+            self._rates = (now, self.bot.request_count, self.bot.failure_count)
+        if now - self._proxies_at >= self.proxy_refresh:
+            self._proxies_at = now
+            self._proxies = self.bot.proxy_pool.worst(5)
+
+    def lines(self) -> list:
+        bot = self.bot
+        board = bot.status_board
+        self._update_rates()
+        now = time.time()
+        lines = [
+            f"LayerEdge Auto-Ping | аккаунтов: {bot.account_count} | "
+            f"{datetime.fromtimestamp(int(now), WIB).strftime('%H:%M:%S')}",
+            "",
+            f"Узлы:     работают {board.count('node_status', 'running')} | "
+            f"нужен перезапуск {board.count('node_status', 'needs_restart')} | "
+            f"неизвестно {board.count('node_status', 'unknown')}",
+            f"Чек-ин:   выполнен {board.count('checkin_status', 'done')} | "
+            f"ожидает {board.count('checkin_status', 'pending')}",
+            f"Ошибки:   аккаунтов с ошибками {board.count('failing', True)}",
+            f"Запросы:  {self._request_rate:.1f}/с | ошибки {self._error_rate:.2f}/с | "
+            f"в расписании {len(bot.scheduler)} | ожидают воркера {bot.scheduler.queue_depth()}",
+            "",
+            "Ближайшие задачи:",
+        ]
+        for due, state, action in bot.scheduler.upcoming(5):
+            lines.append(f"  {bot.format_seconds(max(0, due - now))}  {action:<8} {bot.mask_account(state.address)}")
+        if self._proxies:
+            lines.append("")
+            lines.append("Проблемные прокси:")
+            for proxy, stats in self._proxies:
+                quarantined = " карантин" if stats.quarantined_until > now else ""
+                lines.append(
+                    f"  {bot.proxy_label(proxy)}  ошибок {stats.failures}  подряд {stats.consecutive_failures}{quarantined}"
+                )
+        lines.append("")
+        lines.append("q — выход")
+        return lines
+
+    async def run(self):
+        """Цикл отрисовки; завершается по клавише q."""
+        import curses
+
+        screen = curses.initscr()
+        try:
+            curses.noecho()
+            curses.cbreak()
+            curses.curs_set(0)
+            screen.nodelay(True)
+            while True:
+                if screen.getch() in (ord('q'), ord('Q')):
+                    return
+                height, width = screen.getmaxyx()
+                screen.erase()
+                for row, line in enumerate(self.lines()[:height]):
+                    try:
+                        screen.addnstr(row, 0, line, max(width - 1, 0))
+                    except curses.error:
+                        pass
+                screen.refresh()
+                await asyncio.sleep(1 / self.fps)
+        finally:
+            curses.nocbreak()
+            curses.echo()
+            curses.endwin()
 
-def select_proxy_mode():
-    """Запуск интерактивного меню выбора режима прокси."""
-    return curses.wrapper(select_proxy_mode_menu)
+
+class SessionPool:
+    """
+    Пул HTTP-сессий, сгруппированных по URL прокси (None — прямое соединение).
+    Сессии живут между запросами и повторами: keep-alive, лимиты соединений
+    на хост, вытеснение простаивающих сессий и корректное закрытие.
+    headers — общие заголовки всех запросов: задаются сессии один раз, а не на каждый запрос.
+    on_connect(seconds) вызывается после установки каждого нового соединения.
+    """
+
+    def __init__(self, limit=100, limit_per_host=10, keepalive_timeout=30, idle_ttl=300, on_connect=None,
+                 headers=None):
+        self.headers = CIMultiDict(headers or {})
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.idle_ttl = idle_ttl
+        self.on_connect = on_connect
+        self._sessions = {}
+        self._last_used = {}
+        self._last_eviction = time.monotonic()
+
+    def _make_connector(self, proxy):
+        """Создание коннектора для прокси или прямого соединения."""
+        options = {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+        }
+        if proxy:
+            return ProxyConnector.from_url(proxy, **options)
+        return TCPConnector(**options)
+
+    def _trace_configs(self) -> list:
+        """Замер времени установки соединения (для прокси — вместе с рукопожатием)."""
+        if self.on_connect is None:
+            return []
+
+        async def on_start(session, ctx, params):
+            ctx.connect_started = time.monotonic()
+
+        async def on_end(session, ctx, params):
+            self.on_connect(time.monotonic() - ctx.connect_started)
+
+        trace = TraceConfig()
+        trace.on_connection_create_start.append(on_start)
+        trace.on_connection_create_end.append(on_end)
+        return [trace]
+
+    def get(self, proxy=None) -> ClientSession:
+        """Получение (или создание) сессии для указанного прокси."""
+        now = time.monotonic()
+        if now - self._last_eviction >= self.idle_ttl:
+            self._last_eviction = now
+            asyncio.ensure_future(self.evict_idle())
+        session = self._sessions.get(proxy)
+        if session is None or session.closed:
+            session = ClientSession(
+                connector=self._make_connector(proxy), headers=self.headers, trace_configs=self._trace_configs()
+            )
+            self._sessions[proxy] = session
+        self._last_used[proxy] = now
+        return session
+
+    async def evict_idle(self):
+        """Закрытие сессий, которые не использовались дольше idle_ttl секунд."""
+        deadline = time.monotonic() - self.idle_ttl
+        stale = [proxy for proxy, used in self._last_used.items() if used < deadline]
+        for proxy in stale:
+            self._last_used.pop(proxy, None)
+            session = self._sessions.pop(proxy, None)
+            if session is not None and not session.closed:
+                await session.close()
+
+    async def close(self):
+        """Закрытие всех сессий пула."""
+        sessions = [session for session in self._sessions.values() if not session.closed]
+        self._sessions.clear()
+        self._last_used.clear()
+        await asyncio.gather(*(session.close() for session in sessions), return_exceptions=True)
+        if sessions:
+            # Дать SSL-соединениям корректно завершиться до закрытия цикла событий
+            await asyncio.sleep(0.25)
+
+
+class TraceRecorder:
+    """
+    Запись обменов с API в компактную трассу для офлайн-воспроизведения (replay.py).
+    Формат — JSON lines (со сжатием gzip, если путь оканчивается на .gz): строка-заголовок
+    с перечнем полей, затем по строке на попытку запроса
+    [секунды от начала записи, эндпоинт, HTTP-статус или класс ошибки, задержка в мс, тело ответа].
+    Тела запросов с подписями не пишутся; в ответах адреса кошельков заменяются
+    на "{address}", длинные hex-строки и поля с подписями и ключами — на "<redacted>".
+    """
+
+    VERSION = 1
+    FIELDS = ("t", "endpoint", "outcome", "latency_ms", "body")
+    SECRET_FIELDS = ("sign", "key", "token", "secret", "password")
+    HEX_RE = re.compile(r"0x[0-9a-fA-F]{40,}")
+
+    def __init__(self, path: str):
+        self.path = path
+        opener = gzip.open if path.endswith(".gz") else open
+        # Дозапись: трассы нескольких запусков читаются как одна
+        self._file = opener(path, "at", encoding="utf-8")
+        self._file.write(json.dumps({"trace": self.VERSION, "fields": self.FIELDS}) + "\n")
+        self._started = time.time()
+        self.count = 0
+
+    @classmethod
+    def _redact_hex(cls, match) -> str:
+        return "{address}" if len(match.group(0)) == 42 else "<redacted>"
+
+    @classmethod
+    def redact(cls, value):
+        if isinstance(value, dict):
+            return {
+                key: "<redacted>" if any(word in key.lower() for word in cls.SECRET_FIELDS) else cls.redact(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, list):
+            return [cls.redact(item) for item in value]
+        if isinstance(value, str):
+            return cls.HEX_RE.sub(cls._redact_hex, value)
+        return value
+
+    def record(self, endpoint: str, outcome, latency: float, body=None):
+        """Запись попытки: outcome — HTTP-статус или класс ошибки (RetryPolicy.classify), body — байты ответа."""
+        try:
+            value = self.redact(json.loads(body)) if body else None
+        except ValueError:
+            value = None
+        row = [round(time.time() - self._started, 3), endpoint, outcome, round(latency * 1000, 1), value]
+        self._file.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self):
+        self._file.close()
 
 
 class LayerEdge:
-    def __init__(self) -> None:
+    def __init__(self, config=None) -> None:
         """
         Инициализация бота:
          - Настройка заголовков для HTTP-запросов
          - Список прокси и параметры ротации
+         - Параметры из конфига (см. DEFAULT_CONFIG)
         """
+        config = {**DEFAULT_CONFIG, **(config or {})}
+        user_agent = config["user_agent"]
+        if not user_agent:
+            from fake_useragent import FakeUserAgent
+
+            user_agent = FakeUserAgent().random
         self.headers = {
             "Accept": "application/json, text/plain, */*",
             "Accept-Language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7",
@@ -77,11 +1984,94 @@ class LayerEdge:
             "Sec-Fetch-Dest": "empty",
             "Sec-Fetch-Mode": "cors",
             "Sec-Fetch-Site": "same-site",
-            "User-Agent": FakeUserAgent().random
+            "User-Agent": user_agent
         }
-        self.proxies = []
-        self.proxy_index = 0
-        self.account_proxies = {}
+        self.registry = AccountRegistry()
+        self.proxy_pool = ProxyPool()
+        self.proxy_validator = ProxyValidator(cache_path=config["proxy_cache_file"])
+        self.address_cache = AddressCache()
+        self.derive_workers = os.cpu_count() or 1
+        self.signers = {}
+        self.signer_cache_size = 4096
+        self.signer_lock = threading.Lock()
+        self.validation_tasks = set()
+        # Прокси, проверка которых уже идёт: повторная загрузка файла их не перепроверяет
+        self.validating = set()
+        self.validate_new_proxies = False
+        self.proxy_candidates = set()
+        # Сохранённые прокси восстановленных аккаунтов, ещё не прошедшие проверку: прокси -> число аккаунтов
+        self.pending_proxies = {}
+        self.timeouts = AdaptiveTimeouts(
+            factor=config["timeout_factor"], min_timeout=config["min_timeout"], connect_timeout=config["connect_timeout"]
+        )
+        self.hedge = config["hedge"]
+        self.hedge_ratio = 0.05
+        self.hedge_count = 0
+        self.session_pool = SessionPool(on_connect=self.on_connect, headers=self.headers)
+        # Статические заголовки уходят в сессию; для POST добавляется только тип тела
+        self.json_headers = CIMultiDict({"Content-Type": "application/json"})
+        self.perf = config["perf"]
+        self.json_dumps, self.json_loads, self.json_name = json_codec(self.perf)
+        self.record_path = config["record_file"]
+        self.recorder = None
+        self.retry_policy = RetryPolicy(
+            base_delay=config["retry_base_delay"], factor=config["retry_factor"], max_delay=config["retry_max_delay"]
+        )
+        self.response_cache = ResponseCache()
+        self.limiter = RequestLimiter(
+            max_concurrency=config["max_concurrency"], per_proxy=config["per_proxy_concurrency"], rate=config["rate"]
+        )
+        self.startup_rate = config["startup_rate"]
+        self.endpoints = {name: copy.copy(endpoint) for name, endpoint in ENDPOINTS.items()}
+        for name, timeout in config["timeouts"].items():
+            self.endpoints[name].timeout = timeout
+        for name, retries in config["retries"].items():
+            self.endpoints[name].retries = retries
+        if config["cache_ttl"] is not None:
+            for endpoint in self.endpoints.values():
+                if endpoint.method == "GET":
+                    endpoint.cache_ttl = config["cache_ttl"]
+        self.scheduler = Scheduler(
+            workers=config["workers"], on_error=self.on_job_error, on_start=self.on_job_start,
+            sweep_window=config["sweep_window"], sweep_batch=config["sweep_batch"], sweep_key=self.sweep_key
+        )
+        self.metrics = Metrics()
+        self.metrics_host = config["metrics_host"]
+        self.metrics_port = config["metrics_port"]
+        self.describe_metrics()
+        self.checkin_interval = config["checkin_interval"]
+        self.earning_interval = config["earning_interval"]
+        self.jitter = JitterPolicy(window=config["spread_window"], rate=config["schedule_rate"])
+        self.api_base = config["api_base"]
+        self.proxy_mode = config["proxy_mode"]
+        self.headless = config["headless"]
+        self.accounts_file = config["accounts_file"]
+        self.proxy_file = config["proxy_file"]
+        self.use_proxy = False
+        self.state_path = config["state_file"]
+        self.state_store = None
+        self.shards = config["shards"]
+        self.shard_index = config["shard_index"]
+        self.proxy_download = config["proxy_download"]
+        self.ring = HashRing(self.shards) if self.shard_index is not None else None
+        self.reload_interval = config["reload_interval"]
+        self.file_watcher = None
+        self.shutdown_timeout = config["shutdown_timeout"]
+        self.stop_event = None
+        self.dashboard = Dashboard(self, fps=config["dashboard_fps"]) if config["dashboard"] else None
+        self.status_board = StatusBoard()
+        # В режиме панели экран принадлежит curses, поэтому консольный вывод логов отключается
+        self.logger = LogPipeline(
+            level=config["log_level"], json_path=config["log_file"],
+            console=config["log_console"] and self.dashboard is None, dedupe_window=config["log_dedupe_window"]
+        )
+        self.stats_queue = None
+        # В режиме шардов файл аккаунтов отслеживает супервизор: он вычисляет адреса
+        # новых ключей и взводит это событие (multiprocessing.Event), когда кеш готов
+        self.accounts_reload = None
+        self.account_count = 0
+        self.request_count = 0
+        self.failure_count = 0
 
     def clear_terminal(self):
         """Очистка экрана терминала."""
@@ -103,13 +2093,15 @@ LayerEdge Auto-Ping
         """
         print(banner)
 
-    def log(self, message):
+    def log(self, message, level=None):
         """
-        Логирование сообщений с таймстампом.
+        Логирование сообщений с таймстампом (через фоновый LogPipeline).
         Формат: [HH:MM:SS] >> сообщение
+        Уровень по умолчанию определяется по цвету: красный — error, жёлтый — warning.
         """
-        timestamp = datetime.now().astimezone(WIB).strftime('%H:%M:%S')
-        print(f"{Fore.LIGHTCYAN_EX}[{timestamp}]{Style.RESET_ALL} >> {message}")
+        if level is None:
+            level = "error" if Fore.RED in message else "warning" if Fore.YELLOW in message else "info"
+        self.logger.emit(level, message)
 
     def format_seconds(self, seconds):
         """Преобразование секунд в формат ЧЧ:ММ:СС."""
@@ -125,55 +2117,151 @@ LayerEdge Auto-Ping
         """
         Вывод статуса в одной строке, без больших рамок:
          [HH:MM:SS] >> Account: ... | Proxy: ... | Status: ...
+        Уровень определяется по цвету: красный — error, жёлтый — warning, прочие — info.
         """
-        timestamp = datetime.now().astimezone(WIB).strftime('%H:%M:%S')
-        print(
-            f"{Fore.LIGHTCYAN_EX}[{timestamp}]{Style.RESET_ALL} >> "
-            f"Account: {Fore.WHITE}{self.mask_account(address)}{Style.RESET_ALL} | "
-            f"Proxy: {Fore.WHITE}{proxy}{Style.RESET_ALL} | "
-            f"Status: {color}{message}{Style.RESET_ALL}"
-        )
+        level = "error" if color == Fore.RED else "warning" if color == Fore.YELLOW else "info"
+        self.logger.emit(level, f"{color}{message}{Style.RESET_ALL}", account=self.mask_account(address), proxy=proxy)
 
     async def print_clear_message(self):
         """
-        Периодически выводит сообщение о завершении цикла.
+        Периодически выводит фактическую сводку: запросы и ошибки за минуту,
+        задачи планировщика и время до ближайшей задачи.
         """
+        last_requests, last_failures = self.request_count, self.failure_count
         while True:
             await asyncio.sleep(60)
-            self.log(f"{Fore.BLUE}Все аккаунты обработаны успешно. Ожидание следующего цикла...{Style.RESET_ALL}")
+            requests = self.request_count - last_requests
+            failures = self.failure_count - last_failures
+            last_requests, last_failures = self.request_count, self.failure_count
+            self.response_cache.prune()
+            upcoming = self.scheduler.peek()
+            next_due = self.format_seconds(max(0, upcoming[0] - time.time())) if upcoming else "—"
+            color = Fore.RED if failures else Fore.BLUE
+            self.log(
+                f"{color}За минуту: запросов {requests}, ошибок {failures} | "
+                f"задач в расписании: {len(self.scheduler)}, ожидают воркера: {self.scheduler.queue_depth()} | "
+                f"ближайшая через {next_due}{Style.RESET_ALL}"
+            )
+            if len(self.proxy_pool):
+                stats = self.proxy_pool.stats()
+                quarantined = sum(1 for row in stats if row["quarantined"])
+                self.log(f"{Fore.BLUE}Прокси: здоровых {len(stats) - quarantined}, в карантине {quarantined}{Style.RESET_ALL}")
+
+    def shard_stats(self) -> dict:
+        """Сводка воркера для супервизора."""
+        stats = self.proxy_pool.stats() if len(self.proxy_pool) else []
+        return {
+            "shard": self.shard_index,
+            "pid": os.getpid(),
+            "accounts": self.account_count,
+            "scheduled": len(self.scheduler),
+            "requests": self.request_count,
+            "failures": self.failure_count,
+            "proxies": len(stats),
+            "quarantined": sum(1 for row in stats if row["quarantined"]),
+        }
+
+    async def report_stats(self, interval=10):
+        """Периодическая отправка сводки супервизору."""
+        while True:
+            await asyncio.sleep(interval)
+            self.stats_queue.put(self.shard_stats())
+
+    async def download_proxies(self):
+        """Загрузка списка Monosans Proxy из GitHub с сохранением в файл прокси."""
+        async with ClientSession(timeout=ClientTimeout(total=30)) as session:
+            async with session.get("https://raw.githubusercontent.com/monosans/proxy-list/main/proxies/all.txt") as response:
+                response.raise_for_status()
+                content = await response.text()
+                with open(self.proxy_file, 'w') as f:
+                    f.write(content)
+                # Собственная запись файла — не правка пользователя: горячая перезагрузка её не видит
+                if self.file_watcher is not None:
+                    self.file_watcher.reset(self.proxy_file)
+                return content.splitlines()
 
     async def load_proxies(self, use_proxy_choice: int):
         """
         Загрузка списка прокси:
-         - Если выбран режим Monosans Proxy (1), список загружается из GitHub.
-         - Иначе используется локальный файл proxy.txt.
+         - Если выбран режим Monosans Proxy (1), список загружается из GitHub в файл прокси
+           (в воркерах шардов — читается из файла, уже загруженного супервизором).
+         - Иначе используется локальный файл прокси (по умолчанию proxy.txt).
+        Публичные прокси перед добавлением в пул проверяются в фоне.
         """
-        filename = "proxy.txt"
+        filename = self.proxy_file
+        self.validate_new_proxies = use_proxy_choice == 1
         try:
-            if use_proxy_choice == 1:
-                async with ClientSession(timeout=ClientTimeout(total=30)) as session:
-                    async with session.get("https://raw.githubusercontent.com/monosans/proxy-list/main/proxies/all.txt") as response:
-                        response.raise_for_status()
-                        content = await response.text()
-                        with open(filename, 'w') as f:
-                            f.write(content)
-                        self.proxies = content.splitlines()
-            else:
-                if not os.path.exists(filename):
-                    self.log(f"{Fore.RED}Файл {filename} не найден.{Style.RESET_ALL}")
-                    return
-                with open(filename, 'r') as f:
-                    self.proxies = f.read().splitlines()
+            if use_proxy_choice == 1 and self.proxy_download:
+                await self.download_proxies()
+            elif not os.path.exists(filename):
+                self.log(f"{Fore.RED}Файл {filename} не найден.{Style.RESET_ALL}")
+                return
 
-            if not self.proxies:
+            total, added, _ = self.reload_proxies()
+            if not total:
                 self.log(f"{Fore.RED}Прокси не найдены.{Style.RESET_ALL}")
                 return
-
-            self.log(f"{Fore.GREEN}Всего прокси: {len(self.proxies)}{Style.RESET_ALL}")
+            shard_note = f" (в файле {total})" if self.ring is not None else ""
+            self.log(f"{Fore.GREEN}Всего прокси: {len(self.proxy_candidates)}{shard_note}{Style.RESET_ALL}")
 
         except Exception as e:
             self.log(f"{Fore.RED}Ошибка загрузки прокси: {e}{Style.RESET_ALL}")
-            self.proxies = []
+
+    def reload_proxies(self):
+        """
+        Применение содержимого файла прокси к пулу: новые прокси добавляются
+        (публичные — по мере проверки), исчезнувшие из файла убираются.
+        Статистика и закрепление аккаунтов за остальными прокси не меняются.
+        Возвращает (всего в файле, добавлено, удалено).
+        """
+        def on_invalid(line_no, line):
+            self.log(f"Прокси, строка {line_no}: не удалось разобрать", "debug")
+
+        with open(self.proxy_file, 'r') as f:
+            candidates = list(read_proxies(f, self.check_proxy_schemes, on_invalid))
+        total = len(candidates)
+        # Воркер шарда работает только со своей долей прокси
+        if self.ring is not None and candidates:
+            candidates = self.ring.portion(candidates, self.shard_index)
+
+        self.proxy_candidates = set(candidates)
+        removed = [proxy for proxy in self.proxy_pool if proxy not in self.proxy_candidates]
+        self.proxy_pool.remove(removed)
+        added = [proxy for proxy in candidates if proxy not in self.proxy_pool and proxy not in self.validating]
+        if self.validate_new_proxies:
+            if added:
+                self.validating.update(added)
+                task = asyncio.ensure_future(self.validate_proxies(added))
+                self.validation_tasks.add(task)
+                task.add_done_callback(self.validation_tasks.discard)
+        else:
+            for proxy in added:
+                self.proxy_pool.add(proxy)
+        return total, len(added), len(removed)
+
+    async def validate_proxies(self, candidates):
+        """Фоновая проверка публичных прокси с добавлением рабочих в пул."""
+        def on_valid(proxy, latency):
+            # Прокси мог исчезнуть из файла, пока шла проверка
+            if proxy in self.proxy_candidates:
+                self.proxy_pool.add(proxy)
+                self.proxy_pool.record(proxy, True, latency)
+                # Восстановленные аккаунты, ждавшие этот прокси, снова закрепляются за ним
+                for _ in range(self.pending_proxies.pop(proxy, 0)):
+                    self.proxy_pool.assign(proxy)
+
+        self.log(f"Проверка прокси: {len(candidates)} шт...")
+        try:
+            valid = await self.proxy_validator.validate(candidates, on_valid)
+        except Exception as e:
+            self.log(f"{Fore.RED}Ошибка проверки прокси: {e}{Style.RESET_ALL}")
+            return
+        finally:
+            # Не прошедшие проверку сохранённые прокси больше не ждём: аккаунты получат другие
+            for proxy in candidates:
+                self.pending_proxies.pop(proxy, None)
+            self.validating.difference_update(candidates)
+        self.log(f"{Fore.GREEN}Рабочих прокси: {valid} из {len(candidates)}{Style.RESET_ALL}")
 
     def check_proxy_schemes(self, proxy_str: str):
         """Проверка и корректировка схемы прокси."""
@@ -182,26 +2270,29 @@ LayerEdge Auto-Ping
             return proxy_str
         return f"http://{proxy_str}"
 
-    def get_next_proxy_for_account(self, address):
+    def get_next_proxy_for_account(self, state: AccountState):
         """
-        Назначение следующего прокси для аккаунта.
-        Если для аккаунта ещё не назначен прокси, выбирается текущий и индекс обновляется.
+        Назначение прокси для аккаунта.
+        Если прокси ещё не назначен или ушёл в карантин, выбирается лучший здоровый прокси из пула.
+        Сохранённый прокси, который ещё проверяется, аккаунт ждёт (None), а не меняет.
         """
-        if address not in self.account_proxies:
-            if not self.proxies:
-                return None
-            proxy = self.check_proxy_schemes(self.proxies[self.proxy_index])
-            self.account_proxies[address] = proxy
-            self.proxy_index = (self.proxy_index + 1) % len(self.proxies)
-        return self.account_proxies[address]
+        proxy = state.proxy
+        if proxy is not None and self.proxy_pool.is_healthy(proxy):
+            return proxy
+        if proxy is not None and proxy in self.pending_proxies:
+            return None
+        return self.rotate_proxy_for_account(state)
 
-    def rotate_proxy_for_account(self, address):
-        """Ротация прокси для аккаунта – выбирается следующий прокси из списка."""
-        if not self.proxies:
+    def rotate_proxy_for_account(self, state: AccountState):
+        """Ротация прокси для аккаунта – выбирается другой здоровый прокси с лучшей оценкой."""
+        current = state.proxy
+        proxy = self.proxy_pool.choose(exclude=current)
+        if proxy is None:
             return None
-        proxy = self.check_proxy_schemes(self.proxies[self.proxy_index])
-        self.account_proxies[address] = proxy
-        self.proxy_index = (self.proxy_index + 1) % len(self.proxies)
+        if current is not None:
+            self.proxy_pool.release(current)
+        self.proxy_pool.assign(proxy)
+        state.proxy = proxy
         return proxy
 
     def generate_address(self, account: str):
@@ -209,22 +2300,73 @@ LayerEdge Auto-Ping
         Генерация адреса кошелька из приватного ключа.
         Возвращается адрес или None при ошибке.
         """
-        try:
-            acct = Account.from_key(account)
-            return acct.address
-        except Exception:
-            return None
+        return derive_address(account)
+
+    async def generate_addresses(self, accounts: list) -> list:
+        """
+        Генерация адресов для всего списка ключей.
+        Адреса берутся из дискового кеша, недостающие вычисляются в пуле процессов.
+        Воркеры шардов — демонические процессы и не могут порождать дочерние,
+        поэтому они считают адреса в потоке (основную часть кеша заполняет супервизор).
+        """
+        self.address_cache.load()
+        addresses = [self.address_cache.get(account) for account in accounts]
+        missing = [i for i, address in enumerate(addresses) if address is None]
+        if not missing:
+            self.address_cache.clear()
+            return addresses
+
+        keys = [accounts[i] for i in missing]
+        loop = asyncio.get_running_loop()
+        if len(keys) < 64 or self.derive_workers < 2 or self.shard_index is not None:
+            derived = await loop.run_in_executor(None, lambda: [derive_address(key) for key in keys])
+        else:
+            chunksize = max(1, len(keys) // (self.derive_workers * 4))
+            with ProcessPoolExecutor(max_workers=self.derive_workers) as pool:
+                derived = await loop.run_in_executor(
+                    None, lambda: list(pool.map(derive_address, keys, chunksize=chunksize))
+                )
+
+        for i, address in zip(missing, derived):
+            addresses[i] = address
+            if address:
+                self.address_cache.put(accounts[i], address)
+        self.address_cache.save()
+        self.address_cache.clear()
+        return addresses
+
+    def get_signer(self, account: str):
+        """
+        LocalAccount для ключа. Последние signer_cache_size объектов переиспользуются,
+        чтобы на больших списках кошельков кеш не рос вместе с числом аккаунтов.
+        """
+        with self.signer_lock:
+            signer = self.signers.pop(account, None)
+            if signer is not None:
+                # Переносим в конец: dict сохраняет порядок вставки, первым вытесняется самый старый
+                self.signers[account] = signer
+                return signer
+        from eth_account import Account
+
+        signer = Account.from_key(account)
+        with self.signer_lock:
+            self.signers[account] = signer
+            while len(self.signers) > self.signer_cache_size:
+                del self.signers[next(iter(self.signers))]
+        return signer
 
     def generate_checkin_payload(self, account: str, address: str):
         """
         Формирование данных для ежедневного чек-ина.
         Подписывается сообщение и возвращаются необходимые параметры.
         """
+        from eth_account.messages import encode_defunct
+
         timestamp = int(time.time() * 1000)
         try:
             message = f"I am claiming my daily node point for {address} at {timestamp}"
             encoded = encode_defunct(text=message)
-            signed = Account.sign_message(encoded, private_key=account)
+            signed = self.get_signer(account).sign_message(encoded)
             signature = signed.signature.hex()
             return {"sign": f"0x{signature}", "timestamp": timestamp, "walletAddress": address}
         except Exception:
@@ -234,318 +2376,926 @@ LayerEdge Auto-Ping
         """
         Формирование данных для запроса активации/деактивации узла.
         """
+        from eth_account.messages import encode_defunct
+
         timestamp = int(time.time() * 1000)
         try:
             message = f"Node {msg_type} request for {address} at {timestamp}"
             encoded = encode_defunct(text=message)
-            signed = Account.sign_message(encoded, private_key=account)
+            signed = self.get_signer(account).sign_message(encoded)
             signature = signed.signature.hex()
             return {"sign": f"0x{signature}", "timestamp": timestamp}
         except Exception:
             return None
 
-    async def user_data(self, address: str, proxy=None, retries=5):
+    def sign_in_executor(self, func, *args):
+        """Подпись выполняется в пуле потоков, чтобы не блокировать цикл событий."""
+        return asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def request(self, name: str, address: str, proxy=None, payload_factory=None):
         """
-        Получение информации о кошельке.
-        При статусе 404 производится попытка регистрации.
+        Единый исполнитель запросов к API.
+        Возвращает кортеж (status, json) или (None, None) при окончательной ошибке.
+        payload_factory вызывается на каждой попытке, поэтому подпись и timestamp
+        пересоздаются при повторе. Статусы из endpoint.passthrough возвращаются как есть.
+        Одинаковые параллельные GET-запросы объединяются, ответы кешируются на endpoint.cache_ttl.
         """
-        url = f"https://referralapi.layeredge.io/api/referral/wallet-details/{address}"
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
+        endpoint = self.endpoints[name]
+        if endpoint.method == "GET":
+            return await self.response_cache.fetch(
+                (name, address), endpoint.cache_ttl, lambda: self.send(name, address, proxy, payload_factory)
+            )
+        return await self.send(name, address, proxy, payload_factory)
+
+    async def send(self, name: str, address: str, proxy=None, payload_factory=None):
+        """
+        Выполнение запроса с повторами (без объединения и кеша).
+        После таймаута или ошибки соединения повтор уходит через другой здоровый прокси
+        (закреплённый за аккаунтом прокси при этом не меняется).
+        """
+        endpoint = self.endpoints[name]
+        self.request_count += 1
+        labels = (("endpoint", name),)
+        self.metrics.inc("layeredge_requests_total", labels)
+        url = endpoint.url(self.api_base, address=address)
+        attempt_proxy = proxy
+        for attempt in range(endpoint.retries):
+            if attempt:
+                self.metrics.inc("layeredge_retries_total", labels)
+            headers = None
+            data = None
+            if payload_factory is not None:
+                payload = payload_factory()
+                if inspect.isawaitable(payload):
+                    payload = await payload
+                if payload is None:
+                    self.print_message(address, proxy, Fore.RED, f"{endpoint.error_message}: не удалось подписать сообщение")
+                    return None, None
+                data = self.json_dumps(payload)
+                headers = self.json_headers
+                self.metrics.inc("layeredge_request_bytes_total", labels, len(data))
             try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.get(url=url, headers=self.headers) as response:
-                        if response.status == 404:
-                            await self.user_confirm(address, proxy)
-                            continue
-                        response.raise_for_status()
-                        result = await response.json()
-                        return result.get('data')
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
+                if self.hedge and endpoint.method == "GET":
+                    return await self.send_hedged(endpoint, url, headers, data, attempt_proxy)
+                return await self.send_once(endpoint, url, headers, data, attempt_proxy)
+            except Exception as e:
+                self.metrics.inc("layeredge_errors_total", labels + (("class", self.retry_policy.classify(e)),))
+                if attempt < endpoint.retries - 1 and self.retry_policy.is_retryable(e):
+                    if self.use_proxy and self.retry_policy.is_transport_error(e):
+                        attempt_proxy = self.proxy_pool.choose(exclude=attempt_proxy) or attempt_proxy
+                    await asyncio.sleep(self.retry_policy.delay(attempt))
                     continue
-                self.print_message(self.mask_account(address), proxy, Fore.RED, f"Ошибка получения данных: {str(e)}")
-                return None
+                self.failure_count += 1
+                self.print_message(address, attempt_proxy, Fore.RED, f"{endpoint.error_message}: {str(e)}")
+                return None, None
+        return None, None
+
+    async def send_once(self, endpoint: Endpoint, url: str, headers, data, proxy, sent=None):
+        """
+        Одна попытка запроса с адаптивными таймаутами. Возвращает (status, json);
+        ошибки пробрасываются вызывающему коду, результат учитывается в статистике прокси.
+        sent (asyncio.Event) выставляется, когда запрос прошёл лимитер и уходит в сеть.
+        """
+        labels = (("endpoint", endpoint.name),)
+        started = time.monotonic()
+        timeout = None
+        try:
+            async with self.limiter.slot(endpoint.name, proxy):
+                session = self.session_pool.get(proxy)
+                timeout = self.timeouts.timeout(endpoint, self.proxy_pool.latency_bound(proxy) if proxy else None)
+                if sent is not None:
+                    sent.set()
+                started = time.monotonic()
+                async with session.request(
+                    endpoint.method, url, headers=headers, data=data, timeout=timeout
+                ) as response:
+                    latency = time.monotonic() - started
+                    self.proxy_pool.record(proxy, True, latency)
+                    self.timeouts.observe(endpoint.name, latency)
+                    body = await response.read()
+                    self.metrics.inc("layeredge_response_bytes_total", labels, len(body))
+                    if self.recorder is not None:
+                        self.recorder.record(endpoint.name, response.status, latency, body)
+                    self.metrics.observe("layeredge_request_duration_seconds", time.monotonic() - started, labels)
+                    if response.status in endpoint.passthrough:
+                        return response.status, None
+                    response.raise_for_status()
+                    return response.status, await response.json(loads=self.json_loads)
+        except Exception as e:
+            if timeout is not None:
+                # Таймаут — тоже наблюдение: без него бюджет не вырастет, когда API замедлится
+                if isinstance(e, (ConnectionTimeoutError, ProxyTimeoutError)):
+                    self.timeouts.observe("connect", timeout.sock_connect, timed_out=True)
+                elif isinstance(e, asyncio.TimeoutError):
+                    self.timeouts.observe(endpoint.name, timeout.sock_read, timed_out=True)
+            if self.retry_policy.is_transport_error(e):
+                self.metrics.observe("layeredge_request_duration_seconds", time.monotonic() - started, labels)
+                self.proxy_pool.record(proxy, False)
+                if self.recorder is not None:
+                    self.recorder.record(endpoint.name, self.retry_policy.classify(e), time.monotonic() - started)
+            raise
+
+    async def send_hedged(self, endpoint: Endpoint, url: str, headers, data, proxy):
+        """
+        Попытка с подстраховкой для идемпотентных запросов: если ответа нет дольше p99
+        эндпоинта, параллельно отправляется копия через другой здоровый прокси.
+        Побеждает первый успешный ответ, вторая попытка отменяется. Время в очереди
+        лимитера не считается, а копий не больше hedge_ratio от числа запросов —
+        под нагрузкой подстраховка не должна сама становиться нагрузкой.
+        """
+        sent = asyncio.Event()
+        first = asyncio.ensure_future(self.send_once(endpoint, url, headers, data, proxy, sent))
+        delay = self.timeouts.p99(endpoint.name)
+        if delay is None:
+            return await first
+        pending = {first}
+        try:
+            waiter = asyncio.ensure_future(sent.wait())
+            await asyncio.wait({first, waiter}, return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+            if self.hedge_count >= self.request_count * self.hedge_ratio:
+                return await first
+            backup = self.proxy_pool.choose(exclude=proxy) if self.use_proxy else proxy
+            if self.use_proxy and backup is None:
+                # Без прокси копию не отправляем: запрос ушёл бы напрямую
+                return await first
+            self.hedge_count += 1
+            self.metrics.inc("layeredge_hedged_requests_total", (("endpoint", endpoint.name),))
+            pending.add(asyncio.ensure_future(self.send_once(endpoint, url, headers, data, backup)))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
 
-    async def user_confirm(self, address: str, proxy=None, retries=5):
+    async def user_data(self, address: str, proxy=None):
+        """
+        Получение информации о кошельке.
+        При статусе 404 производится попытка регистрации.
+        """
+        status, result = await self.request("user_data", address, proxy)
+        if status == 404:
+            await self.user_confirm(address, proxy)
+            status, result = await self.request("user_data", address, proxy)
+        if not result:
+            return None
+        return result.get('data')
+
+    async def user_confirm(self, address: str, proxy=None):
         """
         Регистрация кошелька, если он отсутствует.
         """
-        url = "https://referralapi.layeredge.io/api/referral/register-wallet/tHc67a1g"
-        data = json.dumps({"walletAddress": address})
-        headers = {**self.headers, "Content-Length": str(len(data)), "Content-Type": "application/json"}
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=60)) as session:
-                    async with session.post(url=url, headers=headers, data=data) as response:
-                        response.raise_for_status()
-                        return await response.json()
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(address, proxy, Fore.RED, f"Ошибка регистрации: {str(e)}")
-                return None
+        _, result = await self.request(
+            "user_confirm", address, proxy, payload_factory=lambda: {"walletAddress": address}
+        )
+        self.response_cache.invalidate(("user_data", address))
+        return result
 
-    async def daily_checkin(self, account: str, address: str, proxy=None, retries=5):
+    async def daily_checkin(self, account: str, address: str, proxy=None):
         """
         Ежедневный чек-ин для получения очков.
+        Если чек-ин уже выполнен сегодня (405), возвращается {"message": "already claimed"}.
         """
-        url = "https://referralapi.layeredge.io/api/light-node/claim-node-points"
-        payload = self.generate_checkin_payload(account, address)
-        data = json.dumps(payload)
-        headers = {**self.headers, "Content-Length": str(len(data)), "Content-Type": "application/json"}
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=120)) as session:
-                    async with session.post(url=url, headers=headers, data=data) as response:
-                        if response.status == 405:
-                            self.print_message(address, proxy, Fore.YELLOW, "Чек-ин уже выполнен сегодня")
-                            return None
-                        response.raise_for_status()
-                        return await response.json()
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    payload = self.generate_checkin_payload(account, address)
-                    data = json.dumps(payload)
-                    continue
-                self.print_message(address, proxy, Fore.RED, f"Ошибка чек-ина: {str(e)}")
-                return None
+        status, result = await self.request(
+            "daily_checkin", address, proxy,
+            payload_factory=lambda: self.sign_in_executor(self.generate_checkin_payload, account, address)
+        )
+        self.response_cache.invalidate(("user_data", address))
+        if status == 405:
+            self.print_message(address, proxy, Fore.YELLOW, "Чек-ин уже выполнен сегодня")
+            return {"message": "already claimed"}
+        return result
 
-    async def node_status(self, address: str, proxy=None, retries=5):
+    async def node_status(self, address: str, proxy=None):
         """
         Получение статуса узла.
         """
-        url = f"https://referralapi.layeredge.io/api/light-node/node-status/{address}"
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=120)) as session:
-                    async with session.get(url=url, headers=self.headers) as response:
-                        response.raise_for_status()
-                        return await response.json()
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    continue
-                self.print_message(address, proxy, Fore.RED, f"Ошибка получения статуса узла: {str(e)}")
-                return None
+        _, result = await self.request("node_status", address, proxy)
+        return result
 
-    async def start_node(self, account: str, address: str, proxy=None, retries=5):
+    async def start_node(self, account: str, address: str, proxy=None):
         """
         Активация узла.
         """
-        url = f"https://referralapi.layeredge.io/api/light-node/node-action/{address}/start"
-        payload = self.generate_node_payload(account, address, "activation")
-        data = json.dumps(payload)
-        headers = {**self.headers, "Content-Length": str(len(data)), "Content-Type": "application/json"}
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=120)) as session:
-                    async with session.post(url=url, headers=headers, data=data) as response:
-                        response.raise_for_status()
-                        return await response.json()
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    payload = self.generate_node_payload(account, address, "activation")
-                    data = json.dumps(payload)
-                    continue
-                self.print_message(address, proxy, Fore.RED, f"Ошибка запуска узла: {str(e)}")
-                return None
+        _, result = await self.request(
+            "start_node", address, proxy,
+            payload_factory=lambda: self.sign_in_executor(
+                self.generate_node_payload, account, address, "activation"
+            )
+        )
+        self.response_cache.invalidate(("node_status", address))
+        return result
 
-    async def stop_node(self, account: str, address: str, proxy=None, retries=5):
+    async def stop_node(self, account: str, address: str, proxy=None):
         """
         Деактивация узла.
         """
-        url = f"https://referralapi.layeredge.io/api/light-node/node-action/{address}/stop"
-        payload = self.generate_node_payload(account, address, "deactivation")
-        data = json.dumps(payload)
-        headers = {**self.headers, "Content-Length": str(len(data)), "Content-Type": "application/json"}
-        await asyncio.sleep(3)
-        for attempt in range(retries):
-            connector = ProxyConnector.from_url(proxy) if proxy else None
-            try:
-                async with ClientSession(connector=connector, timeout=ClientTimeout(total=120)) as session:
-                    async with session.post(url=url, headers=headers, data=data) as response:
-                        response.raise_for_status()
-                        return await response.json()
-            except (Exception, ClientResponseError) as e:
-                if attempt < retries - 1:
-                    await asyncio.sleep(5)
-                    payload = self.generate_node_payload(account, address, "deactivation")
-                    data = json.dumps(payload)
-                    continue
-                self.print_message(address, proxy, Fore.RED, f"Ошибка остановки узла: {str(e)}")
-                return None
+        _, result = await self.request(
+            "stop_node", address, proxy,
+            payload_factory=lambda: self.sign_in_executor(
+                self.generate_node_payload, account, address, "deactivation"
+            )
+        )
+        self.response_cache.invalidate(("node_status", address))
+        return result
+
+    def describe_metrics(self):
+        """Регистрация метрик бота."""
+        m = self.metrics
+        m.describe("layeredge_requests_total", "counter", "Вызовы API по эндпоинтам")
+        m.describe("layeredge_retries_total", "counter", "Повторные попытки запросов")
+        m.describe("layeredge_hedged_requests_total", "counter", "Медленные GET-запросы, продублированные через другой прокси")
+        m.describe("layeredge_timeout_budget_seconds", "gauge", "Текущий адаптивный таймаут ответа по эндпоинтам")
+        m.describe("layeredge_errors_total", "counter", "Ошибки запросов по классам")
+        m.describe("layeredge_request_duration_seconds", "histogram", "Длительность одной попытки запроса")
+        m.describe("layeredge_request_bytes_total", "counter", "Отправлено байт в теле запросов")
+        m.describe("layeredge_response_bytes_total", "counter", "Получено байт в теле ответов")
+        m.describe("layeredge_proxy_pool", "gauge", "Прокси в пуле по состоянию")
+        m.describe("layeredge_proxy_results", "gauge", "Итоги запросов через прокси (худшие прокси по ошибкам)")
+        m.describe("layeredge_proxy_latency_seconds", "gauge", "EWMA задержки прокси (худшие прокси по ошибкам)")
+        m.describe("layeredge_scheduler_jobs", "gauge", "Задачи в куче планировщика")
+        m.describe("layeredge_scheduler_queue_depth", "gauge", "Наступившие задачи, ожидающие воркера")
+        m.describe("layeredge_job_lag_seconds", "histogram", "Запаздывание запуска задачи относительно срока",
+                   buckets=(0.01, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600))
+        m.describe("layeredge_event_loop_lag_seconds", "histogram", "Задержка цикла событий",
+                   buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5))
+        m.collectors.append(self.collect_metrics)
+
+    def collect_metrics(self, top_proxies=20):
+        """Обновление gauge планировщика и прокси перед выдачей метрик."""
+        m = self.metrics
+        m.set("layeredge_scheduler_jobs", len(self.scheduler))
+        m.set("layeredge_scheduler_queue_depth", self.scheduler.queue_depth())
+        for name, endpoint in self.endpoints.items():
+            m.set("layeredge_timeout_budget_seconds", self.timeouts.budget(endpoint), (("endpoint", name),))
+        m.set("layeredge_timeout_budget_seconds", self.timeouts.connect_budget(), (("endpoint", "connect"),))
+        stats = self.proxy_pool.stats()
+        quarantined = sum(1 for row in stats if row["quarantined"])
+        m.set("layeredge_proxy_pool", len(stats) - quarantined, (("state", "healthy"),))
+        m.set("layeredge_proxy_pool", quarantined, (("state", "quarantined"),))
+        m.clear("layeredge_proxy_results")
+        m.clear("layeredge_proxy_latency_seconds")
+        for row in stats[:top_proxies]:
+            label = (("proxy", self.proxy_label(row["proxy"])),)
+            m.set("layeredge_proxy_results", row["successes"], label + (("result", "success"),))
+            m.set("layeredge_proxy_results", row["failures"], label + (("result", "failure"),))
+            if row["latency"] is not None:
+                m.set("layeredge_proxy_latency_seconds", row["latency"], label)
+
+    @staticmethod
+    def proxy_label(proxy: str) -> str:
+        """Прокси без логина и пароля — для меток и логов."""
+        scheme, sep, rest = proxy.partition("://")
+        return f"{scheme}{sep}{rest.rpartition('@')[2]}"
+
+    def sweep_key(self, state: AccountState) -> str:
+        """Ключ группировки задач при пакетном обходе — прокси аккаунта."""
+        return state.proxy or ""
 
-    async def process_user_earning(self, address: str, use_proxy: bool):
+    def on_connect(self, seconds: float):
+        self.timeouts.observe("connect", seconds)
+
+    def on_job_start(self, action: str, lag: float):
+        self.metrics.observe("layeredge_job_lag_seconds", max(lag, 0.0), (("action", action),))
+
+    async def monitor_loop_lag(self, interval=0.5):
+        """Замер задержки цикла событий для метрик."""
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            self.metrics.observe("layeredge_event_loop_lag_seconds", max(0.0, loop.time() - started - interval))
+
+    def on_job_error(self, state: AccountState, action: str, error: Exception):
+        """Лог непредвиденной ошибки задачи планировщика."""
+        self.print_message(state.address, state.proxy, Fore.RED,
+                           f"Ошибка задачи {action}: {error}")
+
+    def persist(self, state: AccountState):
+        """Сохранение состояния аккаунта в локальное хранилище."""
+        if self.state_store is not None:
+            self.state_store.save(state, state.proxy)
+
+    def schedule_spread(self, state: AccountState, action: str, base: float):
         """
-        Периодическая проверка заработка узла.
+        Постановка задачи со сдвигом аккаунта в окне разброса (см. JitterPolicy).
+        Применяется там, где аккаунты могут совпасть по времени: при первичной
+        синхронизации и восстановлении; дальше интервалы отсчитываются от уже
+        разнесённых моментов, и аккаунты не сходятся обратно.
         """
-        while True:
-            await asyncio.sleep(24 * 60 * 60)
-            proxy = self.get_next_proxy_for_account(address) if use_proxy else None
-            balance = "N/A"
-            user = await self.user_data(address, proxy)
-            if user:
-                balance = user.get("nodePoints", "N/A")
-            self.print_message(address, proxy, Fore.WHITE, f"Заработано {balance} очков")
+        period = {"checkin": self.checkin_interval, "earning": self.earning_interval}.get(action, 86400)
+        due = self.jitter.due(state.address, action, base, self.account_count, period)
+        self.scheduler.schedule(due, state, action)
 
-    async def process_claim_checkin(self, account: str, address: str, use_proxy: bool):
+    def restore(self, state: AccountState, saved: dict):
         """
-        Периодический чек-ин для получения очков.
+        Восстановление аккаунта из хранилища и постановка задач на момент,
+        когда они действительно должны выполниться. Будущие сроки из контрольной
+        точки уже разнесены и сохраняются как есть; просроченные и вычисленные
+        заново (после сбоя) разносятся по окну, чтобы не сработать все разом.
         """
-        while True:
-            proxy = self.get_next_proxy_for_account(address) if use_proxy else None
-            check_in = await self.daily_checkin(account, address, proxy)
-            if check_in and check_in.get("message") == "node points claimed successfully":
-                self.print_message(address, proxy, Fore.GREEN, "Чек-ин выполнен успешно")
-            await asyncio.sleep(12 * 60 * 60)
+        state.last_checkin = saved["last_checkin"]
+        state.node_start = saved["node_start"]
+        state.node_points = saved["node_points"]
+        state.registered = True
+        proxy = saved["proxy"]
+        if self.use_proxy and proxy in self.proxy_pool:
+            state.proxy = proxy
+            self.proxy_pool.assign(proxy)
+        elif self.use_proxy and proxy in self.proxy_candidates and self.validation_tasks:
+            # Публичный прокси ещё проверяется: закрепление восстановится, когда он попадёт в пул
+            state.proxy = proxy
+            self.pending_proxies[proxy] = self.pending_proxies.get(proxy, 0) + 1
+        now = time.time()
+        checkin_due = state.last_checkin + self.checkin_interval if state.last_checkin else now
+        node_due = state.node_start + 86400 if state.node_start else now
+        # Контрольная точка штатной остановки точнее: в ней учтены и прерванные задачи
+        schedule = saved.get("schedule") or {}
+        for action, due in (("earning", now + self.earning_interval), ("checkin", checkin_due), ("node", node_due)):
+            planned = schedule.get(action)
+            if planned is not None and planned > now:
+                self.scheduler.schedule(planned, state, action)
+            else:
+                self.schedule_spread(state, action, max(due if planned is None else planned, now))
+
+    def account_proxy(self, state: AccountState):
+        """Текущий прокси аккаунта или None в режиме без прокси."""
+        return self.get_next_proxy_for_account(state) if self.use_proxy else None
+
+    def job_handlers(self, **overrides) -> dict:
+        """
+        Обработчики задач планировщика (action -> handler; overrides заменяют отдельные).
+        В режиме прокси задача без доступного прокси (пул пуст, прокси ещё проверяются)
+        откладывается на 5 секунд — запросы никогда не уходят напрямую.
+        """
+        handlers = {
+            "sync": self.process_accounts,
+            "earning": self.process_user_earning,
+            "checkin": self.process_claim_checkin,
+            "node": self.process_perform_node,
+            **overrides,
+        }
+
+        def guarded(handler):
+            async def run(state: AccountState):
+                if self.use_proxy and self.account_proxy(state) is None:
+                    return time.time() + 5
+                return await handler(state)
+            return run
+
+        return {action: guarded(handler) for action, handler in handlers.items()}
 
-    async def process_perform_node(self, account: str, address: str, use_proxy: bool):
+    async def process_user_earning(self, state: AccountState):
+        """
+        Периодическая проверка заработка узла (раз в earning_interval секунд).
+        """
+        address = state.address
+        proxy = self.account_proxy(state)
+        balance = "N/A"
+        user = await self.user_data(address, proxy)
+        self.status_board.set(state, "failing", user is None)
+        if user:
+            state.node_points = user.get("nodePoints")
+            balance = user.get("nodePoints", "N/A")
+        self.print_message(address, proxy, Fore.WHITE, f"Заработано {balance} очков")
+        self.persist(state)
+        return time.time() + self.earning_interval
+
+    async def process_claim_checkin(self, state: AccountState):
+        """
+        Периодический чек-ин для получения очков (раз в checkin_interval секунд).
+        """
+        address = state.address
+        proxy = self.account_proxy(state)
+        check_in = await self.daily_checkin(state.account, address, proxy)
+        self.status_board.set(state, "failing", check_in is None)
+        if check_in and check_in.get("message") == "already claimed":
+            self.status_board.set(state, "checkin_status", "done")
+        if check_in and check_in.get("message") == "node points claimed successfully":
+            state.last_checkin = time.time()
+            self.status_board.set(state, "checkin_status", "done")
+            self.print_message(address, proxy, Fore.GREEN, "Чек-ин выполнен успешно")
+            self.persist(state)
+        return time.time() + self.checkin_interval
+
+    async def process_perform_node(self, state: AccountState):
         """
         Управление узлом: активация/деактивация по расписанию.
+        Следующий запуск планируется от startTimestamp, полученного от сервера.
         """
-        while True:
-            proxy = self.get_next_proxy_for_account(address) if use_proxy else None
-            reconnect_time = 10 * 60
-            node = await self.node_status(address, proxy)
-            if node and node.get("message") == "node status":
-                last_connect = node['data'].get('startTimestamp')
-                if last_connect is None:
-                    start = await self.start_node(account, address, proxy)
-                    if start and start.get("message") == "node action executed successfully":
-                        last_connect = start['data'].get('startTimestamp')
-                        now_time = int(time.time())
-                        reconnect_time = last_connect + 86400 - now_time
-                        self.print_message(
-                            address,
-                            proxy,
-                            Fore.GREEN,
-                            f"Узел подключен - Переподключение через: {self.format_seconds(reconnect_time)}"
-                        )
-                else:
+        account, address = state.account, state.address
+        proxy = self.account_proxy(state)
+        reconnect_time = 10 * 60
+        node = await self.node_status(address, proxy)
+        self.status_board.set(state, "failing", node is None)
+        # Пока не подтверждено обратное, узел считается требующим (пере)запуска
+        self.status_board.set(state, "node_status", "needs_restart")
+        if node and node.get("message") == "node status":
+            last_connect = node['data'].get('startTimestamp')
+            state.node_start = last_connect
+            if last_connect is None:
+                start = await self.start_node(account, address, proxy)
+                if start and start.get("message") == "node action executed successfully":
+                    last_connect = start['data'].get('startTimestamp')
+                    state.node_start = last_connect
                     now_time = int(time.time())
-                    connect_time = last_connect + 86400
-                    if now_time >= connect_time:
-                        stop = await self.stop_node(account, address, proxy)
-                        if stop and stop.get("message") == "node action executed successfully":
-                            self.print_message(address, proxy, Fore.GREEN, "Узел отключен - Переподключение...")
-                            await asyncio.sleep(3)
-                            start = await self.start_node(account, address, proxy)
-                            if start and start.get("message") == "node action executed successfully":
-                                last_connect = start['data'].get('startTimestamp')
-                                now_time = int(time.time())
-                                reconnect_time = last_connect + 86400 - now_time
-                                self.print_message(
-                                    address,
-                                    proxy,
-                                    Fore.GREEN,
-                                    f"Узел подключен - Переподключение через: {self.format_seconds(reconnect_time)}"
-                                )
+                    reconnect_time = last_connect + 86400 - now_time
+                    self.status_board.set(state, "node_status", "running")
+                    self.print_message(
+                        address,
+                        proxy,
+                        Fore.GREEN,
+                        f"Узел подключен - Переподключение через: {self.format_seconds(reconnect_time)}"
+                    )
+            else:
+                now_time = int(time.time())
+                connect_time = last_connect + 86400
+                if now_time >= connect_time:
+                    stop = await self.stop_node(account, address, proxy)
+                    if stop and stop.get("message") == "node action executed successfully":
+                        state.node_start = None
+                        self.print_message(address, proxy, Fore.GREEN, "Узел отключен - Переподключение...")
+                        await asyncio.sleep(3)
+                        start = await self.start_node(account, address, proxy)
+                        if start and start.get("message") == "node action executed successfully":
+                            last_connect = start['data'].get('startTimestamp')
+                            state.node_start = last_connect
+                            now_time = int(time.time())
+                            reconnect_time = last_connect + 86400 - now_time
+                            self.status_board.set(state, "node_status", "running")
+                            self.print_message(
+                                address,
+                                proxy,
+                                Fore.GREEN,
+                                f"Узел подключен - Переподключение через: {self.format_seconds(reconnect_time)}"
+                            )
+                else:
+                    reconnect_time = connect_time - now_time
+                    self.status_board.set(state, "node_status", "running")
+                    self.print_message(
+                        address,
+                        proxy,
+                        Fore.YELLOW,
+                        f"Узел уже подключен - Переподключение через: {self.format_seconds(reconnect_time)}"
+                    )
+        self.persist(state)
+        return time.time() + max(reconnect_time, 60)
+
+    async def process_accounts(self, state: AccountState):
+        """
+        Первичная синхронизация аккаунта:
+         - Получение информации о кошельке (со сменой прокси при ошибке)
+         - Постановка задач заработка, чек-ина и управления узлом в планировщик
+        """
+        address = state.address
+        proxy = self.account_proxy(state)
+        user = await self.user_data(address, proxy)
+        self.status_board.set(state, "failing", user is None)
+        if not user:
+            state.sync_attempts += 1
+            if self.use_proxy:
+                self.rotate_proxy_for_account(state)
+            return time.time() + min(5 * state.sync_attempts, 60)
+        state.sync_attempts = 0
+        state.registered = True
+        state.node_points = user.get("nodePoints")
+        self.persist(state)
+        balance = user.get("nodePoints", "N/A")
+        self.print_message(address, proxy, Fore.WHITE, f"Заработано {balance} очков")
+        now = time.time()
+        self.schedule_spread(state, "earning", now + self.earning_interval)
+        self.schedule_spread(state, "checkin", now)
+        self.schedule_spread(state, "node", now)
+        return None
+
+    async def reload_accounts(self) -> tuple:
+        """
+        Применение содержимого файла аккаунтов: новые ключи получают адрес и встают
+        в очередь синхронизации (или восстанавливаются из хранилища), убранные из файла
+        выводятся из работы. Остальные аккаунты и их задачи не затрагиваются.
+        Возвращает (добавлено, удалено).
+        """
+        def on_invalid(line_no, line):
+            if self.ring is None or self.shard_index == 0:
+                self.log(
+                    f"{Fore.RED}[Аккаунт: {self.mask_account(line)}] (строка {line_no}) "
+                    f"- Ошибка генерации адреса. Проверьте приватный ключ.{Style.RESET_ALL}"
+                )
+
+        current = {state.account: state for state in self.registry.states()}
+        seen = set()
+        new_accounts = []
+        with open(self.accounts_file, 'r') as f:
+            for account in read_accounts(f, on_invalid):
+                if account in seen:
+                    continue
+                seen.add(account)
+                if current.pop(account, None) is None:
+                    new_accounts.append(account)
+        # В current остались аккаунты, которых больше нет в файле
+        for state in current.values():
+            self.retire_account(state)
+        added = await self.add_accounts(new_accounts) if new_accounts else 0
+        return added, len(current)
+
+    async def add_accounts(self, accounts: list) -> int:
+        """Регистрация новых аккаунтов (своего шарда) и постановка первичной синхронизации."""
+        addresses = await self.generate_addresses(accounts)
+        saved_states = self.state_store.load() if self.state_store is not None else {}
+        # Первичная синхронизация разносится по времени: startup_rate аккаунтов в секунду.
+        # Восстановленные аккаунты ставятся в расписание после регистрации всех,
+        # чтобы окно разброса считалось по итоговому числу аккаунтов
+        now = time.time()
+        added = 0
+        restored = []
+        for account, address in zip(accounts, addresses):
+            if not address:
+                if self.ring is None or self.shard_index == 0:
+                    self.log(
+                        f"{Fore.RED}[Аккаунт: {self.mask_account(account)}] "
+                        f"- Ошибка генерации адреса. Проверьте приватный ключ.{Style.RESET_ALL}"
+                    )
+                continue
+            if self.ring is not None and self.ring.shard(address) != self.shard_index:
+                continue
+            state = self.registry.add(account, address)
+            self.status_board.add(state)
+            self.account_count += 1
+            saved = saved_states.get(address)
+            if saved and saved["registered"]:
+                restored.append((state, saved))
+            else:
+                self.scheduler.schedule(now + added / self.startup_rate, state, "sync")
+            added += 1
+        for state, saved in restored:
+            self.restore(state, saved)
+        return added
+
+    def retire_account(self, state: AccountState):
+        """Вывод аккаунта из работы: снятие со счётчиков, освобождение прокси и подписи."""
+        proxy = state.proxy
+        if proxy is not None:
+            self.proxy_pool.release(proxy)
+            if self.pending_proxies.get(proxy):
+                self.pending_proxies[proxy] -= 1
+        account = state.account
+        with self.signer_lock:
+            self.signers.pop(account, None)
+        self.status_board.remove(state)
+        self.registry.retire(state)
+        self.account_count -= 1
+
+    async def watch_files(self):
+        """Горячая перезагрузка: изменения файлов аккаунтов и прокси применяются без перезапуска."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            changed = self.file_watcher.changed()
+            if self.accounts_reload is not None and self.accounts_reload.is_set():
+                self.accounts_reload.clear()
+                changed.append(self.accounts_file)
+            for path in changed:
+                try:
+                    if path == self.accounts_file:
+                        added, removed = await self.reload_accounts()
+                        self.log(f"Аккаунты обновлены: добавлено {added}, удалено {removed}, "
+                                 f"всего {self.account_count}")
                     else:
-                        reconnect_time = connect_time - now_time
-                        self.print_message(
-                            address,
-                            proxy,
-                            Fore.YELLOW,
-                            f"Узел уже подключен - Переподключение через: {self.format_seconds(reconnect_time)}"
-                        )
-            await asyncio.sleep(reconnect_time)
-
-    async def process_accounts(self, account: str, address: str, use_proxy: bool):
-        """
-        Обработка аккаунта:
-         - Получение информации о кошельке
-         - Запуск задач по мониторингу заработка, чек-ину и управлению узлом
-        """
-        proxy = self.get_next_proxy_for_account(address) if use_proxy else None
-        user = None
-        while user is None:
-            user = await self.user_data(address, proxy)
-            if not user:
-                proxy = self.rotate_proxy_for_account(address) if use_proxy else None
+                        total, added, removed = self.reload_proxies()
+                        self.log(f"Прокси обновлены: добавлено {added}, удалено {removed}, "
+                                 f"всего {len(self.proxy_candidates)}, в файле {total}")
+                except Exception as e:
+                    self.log(f"{Fore.RED}Ошибка перезагрузки {path}: {e}{Style.RESET_ALL}")
+
+    def request_stop(self, sig=None):
+        """Обработчик SIGINT/SIGTERM: запуск штатной остановки (повторный сигнал ничего не меняет)."""
+        if self.stop_event is None or self.stop_event.is_set():
+            return
+        name = signal.Signals(sig).name if sig is not None else "stop"
+        self.log(f"{Fore.YELLOW}Получен сигнал {name}: завершение работы...{Style.RESET_ALL}")
+        self.stop_event.set()
+
+    def install_signal_handlers(self):
+        """Перехват SIGINT/SIGTERM в цикле событий вместо KeyboardInterrupt."""
+        self.stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self.request_stop, sig)
+            except (NotImplementedError, RuntimeError):
+                # Windows: остаётся стандартная обработка Ctrl-C
+                pass
+
+    def checkpoint(self) -> int:
+        """Запись расписания всех зарегистрированных аккаунтов в хранилище; возвращает число аккаунтов."""
+        if self.state_store is None:
+            return 0
+        schedule = {}
+        for due, state, action in self.scheduler.jobs():
+            if not state.registered or state.retired:
                 continue
-            balance = user.get("nodePoints", "N/A")
-            self.print_message(address, proxy, Fore.WHITE, f"Заработано {balance} очков")
-            tasks = [
-                self.process_user_earning(address, use_proxy),
-                self.process_claim_checkin(account, address, use_proxy),
-                self.process_perform_node(account, address, use_proxy)
-            ]
-            await asyncio.gather(*tasks)
+            actions = schedule.setdefault(state, {})
+            actions[action] = min(due, actions.get(action, due))
+        rows = []
+        for state, actions in schedule.items():
+            address = state.address
+            self.persist(state)
+            rows.extend((address, action, due) for action, due in actions.items())
+        self.state_store.save_schedule(rows)
+        return len(schedule)
+
+    async def shutdown(self, scheduler_task):
+        """
+        Штатная остановка: планировщик перестаёт выдавать задачи, выполняющиеся
+        запросы (в том числе запуск/остановка узлов) дорабатывают до shutdown_timeout,
+        затем расписание сохраняется в контрольную точку.
+        """
+        in_flight = self.scheduler.in_flight()
+        if in_flight:
+            self.log(f"Ожидание {in_flight} выполняющихся задач (не дольше {self.shutdown_timeout:g} сек)...")
+        interrupted = await self.scheduler.shutdown(self.shutdown_timeout)
+        await asyncio.gather(scheduler_task, return_exceptions=True)
+        if interrupted:
+            self.log(f"{Fore.YELLOW}Прервано задач: {interrupted} — при следующем запуске они выполнятся первыми{Style.RESET_ALL}")
+        saved = self.checkpoint()
+        self.log(f"Контрольная точка: сохранено расписание {saved} аккаунтов")
 
     async def main(self):
         """
         Основная функция:
          - Чтение списка аккаунтов из файла
-         - Выбор режима работы с прокси через интерактивное меню
+         - Выбор режима работы с прокси (из конфига или через интерактивное меню)
          - Запуск задач для каждого аккаунта
         """
+        metrics_runner = None
         try:
-            with open('accounts.txt', 'r') as file:
-                accounts = [line.strip() for line in file if line.strip()]
+            if not os.path.exists(self.accounts_file):
+                raise FileNotFoundError(self.accounts_file)
 
             # Выбор режима работы с прокси
-            use_proxy_choice = select_proxy_mode()
+            if self.proxy_mode is not None:
+                use_proxy_choice = PROXY_MODES[self.proxy_mode]
+            else:
+                use_proxy_choice = select_proxy_mode()
             use_proxy = use_proxy_choice in [1, 2]
+            self.use_proxy = use_proxy
 
-            # Очистка экрана и приветствие
-            self.clear_terminal()
-            self.welcome()
+            # Очистка экрана и приветствие (только в интерактивном режиме)
+            if not self.headless:
+                self.clear_terminal()
+                self.welcome()
 
-            # Лог: количество аккаунтов
-            self.log(f"Всего аккаунтов: {len(accounts)}")
+            # Наблюдение начинается до первой загрузки, чтобы не пропустить правки во время старта
+            watched = [self.accounts_file] if self.accounts_reload is None else []
+            watched += [self.proxy_file] if use_proxy else []
+            self.file_watcher = FileWatcher(watched)
 
             # Загрузка прокси при необходимости
             if use_proxy:
                 await self.load_proxies(use_proxy_choice)
 
-            self.log("=" * 80)
-
-            while True:
-                tasks = []
-                for account in accounts:
-                    if account:
-                        address = self.generate_address(account)
-                        if not address:
-                            self.log(
-                                f"{Fore.RED}[Аккаунт: {self.mask_account(account)}] "
-                                f"- Ошибка генерации адреса. Проверьте приватный ключ.{Style.RESET_ALL}"
-                            )
-                            continue
-                        tasks.append(self.process_accounts(account, address, use_proxy))
+            self.state_store = StateStore(self.state_path)
 
-                # Добавляем задачу на периодический вывод
-                tasks.append(self.print_clear_message())
+            # Файл аккаунтов читается построчно; ключи и адреса сразу попадают в компактный реестр
+            await self.reload_accounts()
+            self.state_store.clear_schedule()
+            self.log(f"Всего аккаунтов: {self.account_count}")
+            if self.jitter.window or self.jitter.rate:
+                span = self.jitter.span(self.account_count)
+                self.log(f"Разброс расписания: окно до {self.format_seconds(span)} на действие")
+            if self.perf:
+                loop_name = type(asyncio.get_running_loop()).__module__.split(".")[0]
+                self.log(f"Режим производительности: цикл событий {loop_name}, JSON {self.json_name}")
+            if self.record_path:
+                self.recorder = TraceRecorder(self.record_path)
+                self.log(f"Запись трассы API: {self.record_path}")
+            self.log("=" * 80)
 
-                await asyncio.gather(*tasks)
-                await asyncio.sleep(10)
+            tasks = [self.scheduler.run(self.job_handlers()), self.print_clear_message(), self.monitor_loop_lag()]
+            if self.reload_interval:
+                tasks.append(self.watch_files())
+            if self.metrics_port:
+                port = self.metrics_port + (self.shard_index or 0)
+                metrics_runner = await self.metrics.serve(self.metrics_host, port)
+                self.log(f"Метрики: http://{self.metrics_host}:{port}/metrics")
+            if self.stats_queue is not None:
+                tasks.append(self.report_stats())
+            if self.dashboard is not None:
+                tasks.append(self.dashboard.run())
+            # Работа завершается по сигналу или как только закончится любая из задач
+            # (например, выход из панели по q); планировщик при этом останавливается штатно
+            tasks = [asyncio.ensure_future(task) for task in tasks]
+            scheduler_task = tasks[0]
+            self.install_signal_handlers()
+            stop_task = asyncio.ensure_future(self.stop_event.wait())
+            done, pending = await asyncio.wait(tasks + [stop_task], return_when=asyncio.FIRST_COMPLETED)
+            background = [task for task in pending if task is not scheduler_task]
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+            await self.shutdown(scheduler_task)
+            for task in done:
+                task.result()
 
         except FileNotFoundError:
-            self.log(f"{Fore.RED}Файл 'accounts.txt' не найден.{Style.RESET_ALL}")
+            self.log(f"{Fore.RED}Файл '{self.accounts_file}' не найден.{Style.RESET_ALL}")
             return
         except Exception as e:
             self.log(f"{Fore.RED}Ошибка: {e}{Style.RESET_ALL}")
+        finally:
+            for task in list(self.validation_tasks):
+                task.cancel()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            await self.session_pool.close()
+            if self.state_store is not None:
+                self.state_store.close()
+            if self.recorder is not None:
+                self.recorder.close()
+                self.log(f"Трасса API: записано {self.recorder.count} обменов в {self.record_path}")
+            self.logger.close()
 
 
-if __name__ == "__main__":
+def run_shard(config: dict, stats_queue, accounts_reload):
+    """Точка входа процесса-воркера: свой цикл событий, пул соединений и доля прокси."""
+    if config["perf"]:
+        install_uvloop()
+    bot = LayerEdge(config)
+    bot.stats_queue = stats_queue
+    bot.accounts_reload = accounts_reload
     try:
-        bot = LayerEdge()
         asyncio.run(bot.main())
     except KeyboardInterrupt:
-        print(
-            f"\n{Fore.LIGHTCYAN_EX}[{datetime.now().astimezone(WIB).strftime('%H:%M:%S')}] "
-            f"{Fore.RED}[ ВЫХОД ] LayerEdge Auto-Ping BOT завершил работу.{Style.RESET_ALL}\n"
+        pass
+
+
+def run_supervisor(config: dict):
+    """
+    Режим супервизора: аккаунты делятся между config["shards"] процессами по
+    консистентному хешу адреса. Упавшие воркеры перезапускаются с нарастающей
+    задержкой, сводки воркеров агрегируются и выводятся раз в минуту.
+    Изменения файла аккаунтов отслеживает супервизор: адреса новых ключей
+    вычисляются один раз, после чего воркеры перечитывают файл из готового кеша.
+    """
+    bot = LayerEdge(config)
+    if bot.proxy_mode is None:
+        bot.proxy_mode = {v: k for k, v in PROXY_MODES.items()}[select_proxy_mode()]
+    if not bot.headless:
+        bot.clear_terminal()
+        bot.welcome()
+
+    # Наблюдение начинается до расчёта адресов, чтобы не пропустить правки во время старта
+    file_watcher = FileWatcher([bot.accounts_file])
+    try:
+        with open(bot.accounts_file, 'r') as file:
+            accounts = list(read_accounts(file))
+    except FileNotFoundError:
+        bot.log(f"{Fore.RED}Файл '{bot.accounts_file}' не найден.{Style.RESET_ALL}")
+        bot.logger.close()
+        return
+
+    async def prepare():
+        # Адреса вычисляются один раз и попадают в кеш, общий для всех воркеров
+        await bot.generate_addresses(accounts)
+        if bot.proxy_mode == "monosans":
+            try:
+                await bot.download_proxies()
+            except Exception as e:
+                bot.log(f"{Fore.RED}Ошибка загрузки прокси: {e}{Style.RESET_ALL}")
+
+    asyncio.run(prepare())
+
+    shards = bot.shards
+    worker_config = {
+        **config,
+        "proxy_mode": bot.proxy_mode,
+        "headless": True,
+        "dashboard": False,
+        "proxy_download": False,
+        "user_agent": bot.headers["User-Agent"],
+    }
+    bot.log(f"Запуск {shards} воркеров для {len(accounts)} аккаунтов")
+
+    def on_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM (systemd, docker stop) завершает супервизор так же, как Ctrl-C
+    signal.signal(signal.SIGTERM, on_sigterm)
+
+    stats_queue = multiprocessing.Queue()
+    processes = {}
+    restarts = [0] * shards
+    restart_at = [0.0] * shards
+    reload_events = [multiprocessing.Event() for _ in range(shards)]
+    latest = {}
+
+    def start(index):
+        # У каждого шарда своё хранилище состояния: SQLite не любит конкурентных писателей
+        root, ext = os.path.splitext(bot.state_path)
+        shard_config = {**worker_config, "shard_index": index, "state_file": f"{root}-shard{index}{ext}"}
+        # Кеш проверки прокси тоже свой: шард проверяет только свою долю и иначе затирал бы чужие результаты
+        root, ext = os.path.splitext(config["proxy_cache_file"])
+        shard_config["proxy_cache_file"] = f"{root}-shard{index}{ext}"
+        if config["log_file"]:
+            root, ext = os.path.splitext(config["log_file"])
+            shard_config["log_file"] = f"{root}-shard{index}{ext}"
+        if config["record_file"]:
+            root, ext = os.path.splitext(config["record_file"])
+            shard_config["record_file"] = f"{root}-shard{index}{ext}"
+        process = multiprocessing.Process(
+            target=run_shard, args=(shard_config, stats_queue, reload_events[index]), daemon=True
         )
+        process.start()
+        processes[index] = process
+
+    for index in range(shards):
+        start(index)
+
+    last_report = last_check = time.monotonic()
+    try:
+        while True:
+            try:
+                stats = stats_queue.get(timeout=1)
+                latest[stats["shard"]] = stats
+            except Exception:
+                pass
+
+            now = time.monotonic()
+            for index in range(shards):
+                process = processes.get(index)
+                if process is not None and process.is_alive():
+                    continue
+                if process is not None:
+                    restarts[index] += 1
+                    restart_at[index] = now + min(60, 2 ** restarts[index])
+                    processes[index] = None
+                    bot.log(
+                        f"{Fore.RED}Воркер {index} завершился (код {process.exitcode}), "
+                        f"перезапуск через {int(restart_at[index] - now)} сек{Style.RESET_ALL}"
+                    )
+                elif now >= restart_at[index]:
+                    start(index)
+
+            if bot.reload_interval and now - last_check >= bot.reload_interval:
+                last_check = now
+                if file_watcher.changed():
+                    try:
+                        with open(bot.accounts_file, 'r') as file:
+                            accounts = list(read_accounts(file))
+                        asyncio.run(bot.generate_addresses(accounts))
+                    except Exception as e:
+                        bot.log(f"{Fore.RED}Ошибка перезагрузки {bot.accounts_file}: {e}{Style.RESET_ALL}")
+                    for event in reload_events:
+                        event.set()
+
+            if now - last_report >= 60 and latest:
+                last_report = now
+                totals = {key: sum(s[key] for s in latest.values())
+                          for key in ("accounts", "scheduled", "requests", "failures", "proxies", "quarantined")}
+                bot.log(
+                    f"{Fore.BLUE}Воркеров: {sum(1 for p in processes.values() if p is not None and p.is_alive())}/{shards} | "
+                    f"аккаунтов: {totals['accounts']} | задач: {totals['scheduled']} | "
+                    f"запросов: {totals['requests']} (ошибок: {totals['failures']}) | "
+                    f"прокси: {totals['proxies']} (карантин: {totals['quarantined']}){Style.RESET_ALL}"
+                )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Воркеры получают SIGTERM и останавливаются штатно: дорабатывают запросы и пишут контрольную точку
+        for process in processes.values():
+            if process is not None and process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + bot.shutdown_timeout + 10
+        for process in processes.values():
+            if process is not None:
+                process.join(timeout=max(0.0, deadline - time.monotonic()))
+                if process.is_alive():
+                    process.kill()
+        bot.logger.close()
+
+
+if __name__ == "__main__":
+    try:
+        config = load_config()
+        if config["shards"] > 1:
+            run_supervisor(config)
+        else:
+            if config["perf"]:
+                install_uvloop()
+            bot = LayerEdge(config)
+            asyncio.run(bot.main())
+    except KeyboardInterrupt:
+        pass
+    print(
+        f"\n{Fore.LIGHTCYAN_EX}[{datetime.now().astimezone(WIB).strftime('%H:%M:%S')}] "
+        f"{Fore.RED}[ ВЫХОД ] LayerEdge Auto-Ping BOT завершил работу.{Style.RESET_ALL}\n"
+    )
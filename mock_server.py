@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Локальная заглушка LayerEdge API и тестовый прокси для нагрузочных тестов.
+Эндпоинты повторяют те, что использует бот:
+ - GET  /api/referral/wallet-details/{address}     (404, если кошелёк не зарегистрирован)
+ - POST /api/referral/register-wallet/{code}
+ - POST /api/light-node/claim-node-points          (405, если чек-ин уже выполнен)
+ - GET  /api/light-node/node-status/{address}
+ - POST /api/light-node/node-action/{address}/start|stop
+Запуск: python mock_server.py --port 8080 --latency 0.05 --error-rate 0.01 --rps 500
+"""
+
+import argparse
+import asyncio
+import random
+import struct
+import time
+
+from aiohttp import web
+
+
+class MockLayerEdge:
+    """
+    Состояние и обработчики заглушки API.
+    latency/jitter — задержка ответа в секундах, error_rate — доля ответов 500,
+    rps — лимит запросов в секунду, сверх которого отдаётся 429 (0 — без лимита).
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, rps=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rps = rps
+        self.registered = set()
+        self.claimed = {}
+        self.nodes = {}
+        self.points = {}
+        self.requests = 0
+        self._window = int(time.time())
+        self._window_count = 0
+
+    async def _pre(self):
+        """Общая часть: задержка, лимит запросов и случайные ошибки. Возвращает ответ-ошибку или None."""
+        self.requests += 1
+        now = int(time.time())
+        if now != self._window:
+            self._window = now
+            self._window_count = 0
+        self._window_count += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.rps and self._window_count > self.rps:
+            return web.json_response({"message": "too many requests"}, status=429)
+        if self.error_rate and random.random() < self.error_rate:
+            return web.json_response({"message": "internal error"}, status=500)
+        return None
+
+    async def wallet_details(self, request):
+        error = await self._pre()
+        if error is not None:
+            return error
+        address = request.match_info["address"]
+        if address not in self.registered:
+            return web.json_response({"message": "wallet not found"}, status=404)
+        return web.json_response({"data": {"walletAddress": address, "nodePoints": self.points.get(address, 0)}})
+
+    async def register_wallet(self, request):
+        error = await self._pre()
+        if error is not None:
+            return error
+        payload = await request.json()
+        self.registered.add(payload["walletAddress"])
+        return web.json_response({"message": "registered wallet address successfully"})
+
+    async def claim_node_points(self, request):
+        error = await self._pre()
+        if error is not None:
+            return error
+        payload = await request.json()
+        address = payload["walletAddress"]
+        now = time.time()
+        if now - self.claimed.get(address, 0) < 24 * 60 * 60:
+            return web.json_response({"message": "already claimed"}, status=405)
+        self.claimed[address] = now
+        self.points[address] = self.points.get(address, 0) + 500
+        return web.json_response({"message": "node points claimed successfully"})
+
+    async def node_status(self, request):
+        error = await self._pre()
+        if error is not None:
+            return error
+        address = request.match_info["address"]
+        return web.json_response({"message": "node status", "data": {"startTimestamp": self.nodes.get(address)}})
+
+    async def node_action(self, request):
+        error = await self._pre()
+        if error is not None:
+            return error
+        await request.json()
+        address = request.match_info["address"]
+        if request.match_info["action"] == "start":
+            self.nodes[address] = int(time.time())
+        else:
+            self.nodes.pop(address, None)
+        return web.json_response({
+            "message": "node action executed successfully",
+            "data": {"startTimestamp": self.nodes.get(address)},
+        })
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/referral/wallet-details/{address}", self.wallet_details)
+        app.router.add_post("/api/referral/register-wallet/{code}", self.register_wallet)
+        app.router.add_post("/api/light-node/claim-node-points", self.claim_node_points)
+        app.router.add_get("/api/light-node/node-status/{address}", self.node_status)
+        app.router.add_post("/api/light-node/node-action/{address}/{action}", self.node_action)
+        return app
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _tunnel(client_reader, client_writer, host, port):
+    remote_reader, remote_writer = await asyncio.open_connection(host, port)
+    await asyncio.gather(_pipe(client_reader, remote_writer), _pipe(remote_reader, client_writer))
+
+
+async def handle_proxy_client(reader, writer):
+    """
+    Тестовый прокси на одном порту: SOCKS5 (без авторизации) или HTTP CONNECT —
+    протокол определяется по первому байту.
+    """
+    try:
+        first = await reader.readexactly(1)
+        if first == b"\x05":
+            nmethods = (await reader.readexactly(1))[0]
+            await reader.readexactly(nmethods)
+            writer.write(b"\x05\x00")
+            _, cmd, _, atyp = await reader.readexactly(4)
+            if atyp == 1:
+                host = ".".join(str(b) for b in await reader.readexactly(4))
+            elif atyp == 3:
+                host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+            else:
+                writer.close()
+                return
+            port = struct.unpack(">H", await reader.readexactly(2))[0]
+            writer.write(b"\x05\x00\x00\x01" + bytes(4) + bytes(2))
+            await _tunnel(reader, writer, host, port)
+        else:
+            head = first + await reader.readuntil(b"\r\n\r\n")
+            request_line = head.split(b"\r\n", 1)[0].decode()
+            method, target, _ = request_line.split(" ", 2)
+            if method != "CONNECT":
+                writer.write(b"HTTP/1.1 405 Method Not Allowed\r\nContent-Length: 0\r\n\r\n")
+                writer.close()
+                return
+            host, port = target.rsplit(":", 1)
+            writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            await _tunnel(reader, writer, host, int(port))
+    except (asyncio.IncompleteReadError, ConnectionError, OSError, ValueError):
+        writer.close()
+
+
+async def start_mock(host="127.0.0.1", port=8080, proxy_port=None, **options):
+    """Запуск заглушки (и прокси, если задан proxy_port) в текущем цикле событий."""
+    mock = MockLayerEdge(**options)
+    runner = web.AppRunner(mock.create_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    proxy_server = None
+    if proxy_port:
+        proxy_server = await asyncio.start_server(handle_proxy_client, host, proxy_port)
+    return mock, runner, proxy_server
+
+
+async def serve(args):
+    await start_mock(
+        args.host, args.port, args.proxy_port,
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, rps=args.rps
+    )
+    print(f"Mock LayerEdge API: http://{args.host}:{args.port}/api")
+    if args.proxy_port:
+        print(f"Mock proxy (HTTP CONNECT / SOCKS5): {args.host}:{args.proxy_port}")
+    await asyncio.Event().wait()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Заглушка LayerEdge API для нагрузочных тестов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--proxy-port", type=int, default=0, help="порт тестового прокси (0 — не запускать)")
+    parser.add_argument("--latency", type=float, default=0.0, help="базовая задержка ответа, сек")
+    parser.add_argument("--jitter", type=float, default=0.0, help="случайная добавка к задержке, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--rps", type=int, default=0, help="лимит запросов в секунду, сверх — 429")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(serve(parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Офлайн-воспроизведение трассы API (bot.py --record) в ускоренном виртуальном времени.
+Бот работает целиком — планировщик, лимитер, таймауты, повторы, подстраховка, —
+но вместо сети отвечает модель API: состояние кошельков (регистрация, чек-ин раз в 24 часа,
+старт узла) ведётся по правилам сервера, а задержки, сбои и тела ответов берутся из трассы.
+Часы бота (time.time, time.monotonic) и таймеры цикла событий (asyncio.sleep, таймауты)
+идут в виртуальном времени: когда все задачи ждут, время сразу переводится к ближайшему таймеру.
+Отчёт: выполненные задачи и скорость планировщика, запросы, повторы и сбои,
+равномерность нагрузки по минутам, рост памяти и размера расписания.
+Пример: python replay.py --trace trace.jsonl.gz --wallets 10000 --days 3
+Без трассы задержка и доля ошибок задаются явно: python replay.py --latency 0.2 --error-rate 0.02
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import random
+import re
+import time
+from collections import Counter
+
+from aiohttp import ClientConnectionError, ClientResponseError, RequestInfo
+from multidict import CIMultiDict, CIMultiDictProxy
+from yarl import URL
+
+import bot
+from benchmark import peak_rss_mb, percentile
+
+VIRTUAL_EPOCH = 1_700_000_000.0
+
+
+class VirtualClock:
+    """
+    Виртуальные часы вместо модуля time в bot.py: time() — unix-время от start,
+    monotonic() — секунды с начала воспроизведения; остальные функции модуля time
+    проксируются как есть. Цикл событий считает время от нуля: у unix-времени шаг
+    float (~2e-7 с) крупнее разрешения таймеров asyncio, и таймер мог бы не наступить.
+    """
+
+    def __init__(self, start: float):
+        self.start = start
+        self.elapsed = 0.0
+
+    @property
+    def now(self) -> float:
+        return self.start + self.elapsed
+
+    def time(self) -> float:
+        return self.start + self.elapsed
+
+    def monotonic(self) -> float:
+        return self.elapsed
+
+    perf_counter = monotonic
+
+    def advance(self, seconds: float):
+        self.elapsed += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class VirtualSelector:
+    """
+    Обёртка селектора цикла событий: если готовых событий нет, вместо ожидания
+    в select(timeout) виртуальное время переводится вперёд на timeout — до ближайшего таймера.
+    Итерация с готовыми задачами занимает tick виртуального времени, как реальная работа:
+    иначе ожидание короче разрешения таймеров (например, в TokenBucket) крутилось бы вечно.
+    """
+
+    def __init__(self, selector, clock: VirtualClock, tick=1e-6):
+        self._selector = selector
+        self._clock = clock
+        self._tick = tick
+
+    def select(self, timeout=None):
+        events = self._selector.select(0)
+        if events or timeout == 0:
+            self._clock.advance(self._tick)
+            return events
+        if timeout is None:
+            # Таймеров нет: ждать можно только реальных событий
+            return self._selector.select(None)
+        self._clock.advance(timeout)
+        return events
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Цикл событий в виртуальном времени VirtualClock."""
+
+    def __init__(self, clock: VirtualClock):
+        super().__init__()
+        self.clock = clock
+        self._selector = VirtualSelector(self._selector, clock)
+
+    def time(self) -> float:
+        return self.clock.elapsed
+
+
+class TraceProfile:
+    """
+    Профиль ответов API по эндпоинтам: задержки успешных ответов, доля и состав сбоев
+    (HTTP-статусы вне passthrough эндпоинта, таймауты, обрывы соединения) и последнее
+    тело ответа для каждого статуса — шаблон, по которому модель строит свои ответы.
+    """
+
+    def __init__(self):
+        self.latencies = {name: [] for name in bot.ENDPOINTS}
+        self.failures = {name: [] for name in bot.ENDPOINTS}
+        self.failure_rate = {name: 0.0 for name in bot.ENDPOINTS}
+        self.templates = {}
+        self.records = 0
+
+    @classmethod
+    def load(cls, paths) -> "TraceProfile":
+        profile = cls()
+        for path in paths:
+            opener = gzip.open if path.endswith(".gz") else open
+            with opener(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    row = json.loads(line)
+                    if isinstance(row, dict):
+                        # Заголовок записи (их несколько, если трасса дописывалась)
+                        continue
+                    _, name, outcome, latency_ms, body = row
+                    if name in bot.ENDPOINTS:
+                        profile.add(name, outcome, latency_ms / 1000, body)
+        profile.finish()
+        return profile
+
+    @classmethod
+    def synthetic(cls, latency: float, error_rate: float) -> "TraceProfile":
+        """Профиль без трассы: фиксированная задержка и доля ответов 500."""
+        profile = cls()
+        for name in bot.ENDPOINTS:
+            profile.latencies[name].append(latency)
+            profile.failures[name].append((500, latency))
+        profile.finish()
+        for name in bot.ENDPOINTS:
+            profile.failure_rate[name] = error_rate
+        return profile
+
+    def add(self, name: str, outcome, latency: float, body=None):
+        self.records += 1
+        endpoint = bot.ENDPOINTS[name]
+        if isinstance(outcome, int) and body is not None:
+            self.templates[(name, outcome)] = body
+        if isinstance(outcome, int) and (outcome < 400 or outcome in endpoint.passthrough):
+            self.latencies[name].append(latency)
+        else:
+            self.failures[name].append((outcome, latency))
+
+    def finish(self):
+        for name in bot.ENDPOINTS:
+            total = len(self.latencies[name]) + len(self.failures[name])
+            self.failure_rate[name] = len(self.failures[name]) / total if total else 0.0
+
+    def sample(self, name: str, rng: random.Random) -> tuple:
+        """Исход попытки: ("ok", задержка) или (статус либо класс ошибки, задержка)."""
+        if self.failures[name] and rng.random() < self.failure_rate[name]:
+            return rng.choice(self.failures[name])
+        latencies = self.latencies[name] or [0.0]
+        return "ok", rng.choice(latencies)
+
+
+class ReplayAPI:
+    """
+    Модель API для воспроизведения: правила сервера (как в mock_server.py) в виртуальном
+    времени, исходы попыток — из профиля трассы с детерминированным генератором (seed).
+    Тела ответов — шаблоны из трассы с полями, заполненными по состоянию модели.
+    """
+
+    def __init__(self, profile: TraceProfile, clock: VirtualClock, seed=0):
+        self.profile = profile
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.registered = set()
+        self.claimed = {}
+        self.nodes = {}
+        self.points = {}
+        self.requests = Counter()
+        self.outcomes = Counter()
+        self.routes = []
+        for name, endpoint in bot.ENDPOINTS.items():
+            pattern = re.escape(endpoint.path).replace(re.escape("{address}"), "(?P<address>[^/]+)")
+            self.routes.append((endpoint.method, re.compile(pattern + "$"), name))
+
+    def route(self, method: str, url: str) -> tuple:
+        path = URL(url).path
+        for route_method, pattern, name in self.routes:
+            if route_method == method:
+                match = pattern.search(path)
+                if match:
+                    return name, match.groupdict().get("address")
+        raise ValueError(f"неизвестный запрос: {method} {url}")
+
+    def handle(self, name: str, address: str, payload: dict) -> tuple:
+        """Ответ по правилам сервера: (status, body)."""
+        now = self.clock.now
+        if name == "user_data":
+            if address not in self.registered:
+                return 404, {"message": "wallet not found"}
+            return 200, {"data": {"walletAddress": address, "nodePoints": self.points.get(address, 0)}}
+        if name == "user_confirm":
+            self.registered.add(payload["walletAddress"])
+            return 200, {"message": "registered wallet address successfully"}
+        if name == "daily_checkin":
+            if now - self.claimed.get(address, 0) < 24 * 60 * 60:
+                return 405, {"message": "already claimed"}
+            self.claimed[address] = now
+            self.points[address] = self.points.get(address, 0) + 500
+            return 200, {"message": "node points claimed successfully"}
+        if name == "node_status":
+            return 200, {"message": "node status", "data": {"startTimestamp": self.nodes.get(address)}}
+        if name == "start_node":
+            self.nodes[address] = int(now)
+        else:
+            self.nodes.pop(address, None)
+        return 200, {"message": "node action executed successfully", "data": {"startTimestamp": self.nodes.get(address)}}
+
+    @classmethod
+    def fill(cls, template, body, address: str):
+        """Шаблон из трассы, поверх которого записаны поля ответа модели."""
+        if isinstance(template, dict) and isinstance(body, dict):
+            merged = {key: cls.fill(value, body.get(key), address) for key, value in template.items()}
+            for key, value in body.items():
+                merged.setdefault(key, value)
+            return merged
+        if body is not None:
+            return body
+        if isinstance(template, dict):
+            return {key: cls.fill(value, None, address) for key, value in template.items()}
+        if isinstance(template, list):
+            return [cls.fill(item, None, address) for item in template]
+        if isinstance(template, str):
+            return template.replace("{address}", address or "")
+        return template
+
+    async def exchange(self, method: str, url: str, data) -> tuple:
+        """Одна попытка: (status, тело в байтах) или исключение, как у aiohttp."""
+        name, address = self.route(method, url)
+        payload = json.loads(data) if data else {}
+        address = address or payload.get("walletAddress")
+        outcome, latency = self.profile.sample(name, self.rng)
+        self.requests[name] += 1
+        self.outcomes[(name, outcome)] += 1
+        if outcome == "timeout":
+            # Ответа нет: срабатывает таймаут самого бота
+            await asyncio.Event().wait()
+        await asyncio.sleep(latency)
+        if outcome in ("connection", "proxy"):
+            raise ClientConnectionError(f"replay: {outcome}")
+        if outcome in ("invalid_response", "other"):
+            return 200, b"<html>replay</html>"
+        if outcome != "ok":
+            status = outcome if isinstance(outcome, int) else 500
+            body = self.profile.templates.get((name, status), {"message": "replay error"})
+            return status, json.dumps(body).encode()
+        status, body = self.handle(name, address, payload)
+        template = self.profile.templates.get((name, status))
+        if template is not None:
+            body = self.fill(template, body, address)
+        return status, json.dumps(body).encode()
+
+
+class ReplayResponse:
+    """Ответ модели с интерфейсом aiohttp.ClientResponse, который использует бот."""
+
+    def __init__(self, method: str, url: str, status: int, body: bytes):
+        self.method = method
+        self.url = url
+        self.status = status
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def json(self, loads=json.loads):
+        try:
+            return loads(self._body)
+        except ValueError:
+            raise self._error("invalid response body") from None
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise self._error("replay")
+
+    def _error(self, message: str) -> ClientResponseError:
+        url = URL(self.url)
+        info = RequestInfo(url, self.method, CIMultiDictProxy(CIMultiDict()), url)
+        return ClientResponseError(info, (), status=self.status, message=message)
+
+
+class ReplayRequest:
+    """Асинхронный контекстный менеджер запроса; учитывает таймаут бота (timeout.total)."""
+
+    def __init__(self, api: ReplayAPI, method: str, url: str, data, timeout):
+        self.api = api
+        self.method = method
+        self.url = url
+        self.data = data
+        self.timeout = timeout
+
+    async def __aenter__(self) -> ReplayResponse:
+        total = self.timeout.total if self.timeout is not None else None
+        status, body = await asyncio.wait_for(self.api.exchange(self.method, self.url, self.data), total)
+        return ReplayResponse(self.method, self.url, status, body)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return False
+
+
+class ReplaySessionPool:
+    """Замена SessionPool: одна «сессия» на все прокси, ответы — из ReplayAPI."""
+
+    def __init__(self, api: ReplayAPI):
+        self.api = api
+
+    def get(self, proxy=None):
+        return self
+
+    def request(self, method, url, headers=None, data=None, timeout=None) -> ReplayRequest:
+        return ReplayRequest(self.api, method, url, data, timeout)
+
+    async def close(self):
+        pass
+
+
+class SimLayerEdge(bot.LayerEdge):
+    """LayerEdge для воспроизведения: без вывода в консоль, подпись — без пула потоков."""
+
+    def __init__(self, config=None, sign=False):
+        super().__init__(config)
+        self.sign = sign
+        self.jobs = Counter()
+        self.job_lags = []
+
+    def log(self, message, level=None):
+        pass
+
+    def print_message(self, address, proxy, color, message):
+        pass
+
+    def on_job_start(self, action: str, lag: float):
+        super().on_job_start(action, lag)
+        self.jobs[action] += 1
+        self.job_lags.append(max(lag, 0.0))
+
+    def sign_in_executor(self, func, *args):
+        # Потоки не знают о виртуальном времени, поэтому подпись выполняется сразу.
+        # Без --sign тело содержит только адрес: модель подпись не проверяет
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(func(*args) if self.sign else {"walletAddress": args[1]})
+        return future
+
+
+def current_rss_mb():
+    """Текущий RSS процесса в мегабайтах (Linux), иначе — пиковый."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return peak_rss_mb()
+    import resource
+
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+async def monitor(sim: SimLayerEdge, api: ReplayAPI, per_minute: list, memory: list, interval=60.0):
+    """Раз в виртуальную минуту — число запросов; раз в виртуальный час — память и размер расписания."""
+    last = 0
+    ticks = 0
+    while True:
+        await asyncio.sleep(interval)
+        total = sum(api.requests.values())
+        per_minute.append(total - last)
+        last = total
+        ticks += 1
+        if ticks % 60 == 0:
+            memory.append((current_rss_mb() or 0.0, len(sim.scheduler)))
+
+
+async def run_replay(args, profile: TraceProfile, clock: VirtualClock) -> dict:
+    rng = random.Random(args.seed)
+    # Бот берёт джиттер повторов и выбор прокси из модуля random
+    random.seed(args.seed)
+    api = ReplayAPI(profile, clock, seed=args.seed)
+    config = {
+        "user_agent": "replay", "api_base": "https://replay.invalid/api", "workers": args.workers,
+        "rate": args.rate, "startup_rate": args.startup_rate, "spread_window": args.spread_window,
+        "schedule_rate": args.schedule_rate,
+    }
+    sim = SimLayerEdge(config, sign=args.sign)
+    sim.session_pool = ReplaySessionPool(api)
+    if args.proxies:
+        sim.use_proxy = True
+        sim.proxy_pool.update(f"http://u{i}:p@10.0.{i >> 8 & 255}.{i & 255}:8080" for i in range(args.proxies))
+
+    setup_started = time.monotonic()
+    now = clock.now
+    for index in range(args.wallets):
+        key = f"0x{rng.getrandbits(256):064x}"
+        address = bot.derive_address(key) if args.sign else f"0x{rng.getrandbits(160):040x}"
+        state = sim.registry.add(key, address)
+        sim.status_board.add(state)
+        sim.account_count += 1
+        sim.scheduler.schedule(now + index / sim.startup_rate, state, "sync")
+    setup_time = time.monotonic() - setup_started
+    handlers = sim.job_handlers()
+
+    per_minute = []
+    memory = [(current_rss_mb() or 0.0, len(sim.scheduler))]
+    monitor_task = asyncio.ensure_future(monitor(sim, api, per_minute, memory))
+    scheduler_task = asyncio.ensure_future(sim.scheduler.run(handlers))
+    started = time.monotonic()
+    virtual_started = clock.now
+    await asyncio.sleep(args.days * 86400)
+    elapsed = time.monotonic() - started
+    virtual_elapsed = clock.now - virtual_started
+    scheduler_task.cancel()
+    monitor_task.cancel()
+    await asyncio.gather(scheduler_task, monitor_task, return_exceptions=True)
+
+    requests = sum(api.requests.values())
+    # Попытки сверх логических запросов и копий подстраховки — повторы
+    retries = requests - sim.request_count - sim.hedge_count
+    injected = sum(count for (_, outcome), count in api.outcomes.items() if outcome != "ok")
+    jobs = sum(sim.jobs.values())
+    mean_per_minute = requests / len(per_minute) if per_minute else 0.0
+    return {
+        "wallets": args.wallets,
+        "days": args.days,
+        "trace_records": profile.records,
+        "setup_seconds": round(setup_time, 3),
+        "wall_seconds": round(elapsed, 3),
+        "speedup": round(virtual_elapsed / elapsed, 1) if elapsed else 0.0,
+        "jobs": dict(sim.jobs),
+        "jobs_per_second": round(jobs / elapsed, 1) if elapsed else 0.0,
+        "job_lag_p99_s": round(percentile(sim.job_lags, 99), 2),
+        "requests": requests,
+        "requests_per_endpoint": dict(api.requests),
+        "injected_failures": injected,
+        "retries": retries,
+        "failed_requests": sim.failure_count,
+        "hedged_requests": sim.hedge_count,
+        "nodes_running": len(api.nodes),
+        "requests_per_minute_mean": round(mean_per_minute, 1),
+        "requests_per_minute_p99": percentile(per_minute, 99),
+        "requests_per_minute_max": max(per_minute, default=0),
+        "rss_start_mb": round(memory[0][0], 1),
+        "rss_end_mb": round(memory[-1][0], 1),
+        "schedule_start": memory[0][1],
+        "schedule_end": memory[-1][1],
+    }
+
+
+def format_report(result: dict) -> str:
+    jobs = " ".join(f"{action}={count}" for action, count in sorted(result["jobs"].items()))
+    return (
+        f"wallets={result['wallets']} days={result['days']} trace={result['trace_records']} | "
+        f"wall={result['wall_seconds']}s (setup {result['setup_seconds']}s) speedup={result['speedup']}x | "
+        f"jobs: {jobs} ({result['jobs_per_second']}/s, lag p99={result['job_lag_p99_s']}s) | "
+        f"req={result['requests']} injected={result['injected_failures']} retries={result['retries']} "
+        f"failed={result['failed_requests']} hedged={result['hedged_requests']} | "
+        f"req/min mean={result['requests_per_minute_mean']} p99={result['requests_per_minute_p99']} "
+        f"max={result['requests_per_minute_max']} | "
+        f"rss {result['rss_start_mb']}->{result['rss_end_mb']}MB "
+        f"schedule {result['schedule_start']}->{result['schedule_end']}"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Воспроизведение трассы API LayerEdge в виртуальном времени")
+    parser.add_argument("--trace", nargs="+", help="файлы трассы (bot.py --record); без них — синтетический профиль")
+    parser.add_argument("--latency", type=float, default=0.2, help="задержка ответа без трассы, сек")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500 без трассы")
+    parser.add_argument("--wallets", type=int, default=10000)
+    parser.add_argument("--days", type=float, default=3.0, help="длительность в виртуальных сутках")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--proxies", type=int, default=0, help="число виртуальных прокси (0 — без прокси)")
+    parser.add_argument("--workers", type=int, default=bot.DEFAULT_CONFIG["workers"])
+    parser.add_argument("--rate", type=float, default=bot.DEFAULT_CONFIG["rate"], help="лимит запросов в секунду на эндпоинт")
+    parser.add_argument("--startup-rate", type=float, default=bot.DEFAULT_CONFIG["startup_rate"])
+    parser.add_argument("--spread-window", type=float, default=bot.DEFAULT_CONFIG["spread_window"])
+    parser.add_argument("--schedule-rate", type=float, default=bot.DEFAULT_CONFIG["schedule_rate"])
+    parser.add_argument("--sign", action="store_true", help="настоящие адреса и подписи (медленнее)")
+    parser.add_argument("--json", action="store_true", help="вывод результата в формате JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    profile = TraceProfile.load(args.trace) if args.trace else TraceProfile.synthetic(args.latency, args.error_rate)
+    # Фиксированное начало отсчёта: от него зависят метки времени узлов, а значит и расписание
+    clock = VirtualClock(VIRTUAL_EPOCH)
+    # Бот читает время через модуль time — подменяем его виртуальными часами
+    bot.time = clock
+    loop = VirtualTimeLoop(clock)
+    asyncio.set_event_loop(loop)
+    try:
+        result = loop.run_until_complete(run_replay(args, profile, clock))
+        # Как asyncio.run: отменённые задачи планировщика доводятся до конца до закрытия цикла
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+    finally:
+        bot.time = time
+        loop.close()
+    print(json.dumps(result) if args.json else format_report(result), flush=True)
+
+
+if __name__ == "__main__":
+    main()